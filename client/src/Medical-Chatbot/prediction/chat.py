@@ -1,43 +1,136 @@
 import nltk
-nltk.download('wordnet')
+import os
+import re
 import random
 import numpy as np
 import json
 import pickle
+import hashlib
+import metrics
+from functools import lru_cache
 from nltk.stem import WordNetLemmatizer
-from tensorflow.keras.models import load_model
-nltk.download('punkt')
-nltk.download('omw-1.4')
+from nltk_setup import ensure_nltk_data
+
+# NLTK data is resolved offline (see nltk_setup.py) instead of downloaded on every start
+ensure_nltk_data()
 
 lemmatizer=WordNetLemmatizer()
-lemmatizer.lemmatize('cats')
+lemmatizer.lemmatize('cats')  # Load WordNet now rather than on the first message
+nltk.word_tokenize('warm up')  # Same for the punkt tokenizer
 
 with open('intents.json') as json_file:
     intents = json.load(json_file)
 
+# Lemmas of every token seen in training (lemmas.pkl, written by train_chatbot.py);
+# other words go through WordNet once and are memoized in a bounded LRU. A retrained
+# model's new words take the WordNet path, which gives the same lemmas.
+if os.path.exists('lemmas.pkl'):
+  lemma_table=pickle.load(open('lemmas.pkl','rb'))
+else:
+  lemma_table={word:lemmatizer.lemmatize(word) for word in pickle.load(open('words.pkl','rb'))}
+
+@lru_cache(maxsize=int(os.environ.get('CHATBOT_LEMMA_CACHE_SIZE',4096)))
+def lemmatize_unseen(word):
+  return lemmatizer.lemmatize(word)
+
+def lemmatize(word):
+  lemma=lemma_table.get(word)
+  return lemma if lemma is not None else lemmatize_unseen(word)
+
+# CHATBOT_BACKEND: "numpy" serves the exported chatbotmodel.npz without importing
+# TensorFlow, "keras" loads chatbotmodel.h5; "auto" uses the .npz when it exists
+CHATBOT_BACKEND=os.environ.get('CHATBOT_BACKEND','auto')
+
+def intent_model_path(backend=CHATBOT_BACKEND):
+  if backend=='numpy' or (backend=='auto' and os.path.exists('chatbotmodel.npz')):
+    return 'chatbotmodel.npz'
+  return 'chatbotmodel.h5'
+
+def load_intent_model(backend=CHATBOT_BACKEND):
+  if intent_model_path(backend).endswith('.npz'):
+    from numpy_model import NumpyMLP
+    return NumpyMLP('chatbotmodel.npz')
+  from tensorflow.keras.models import load_model
+  return load_model('chatbotmodel.h5')
+
+# Files written by one training run; they are only ever loaded, and swapped, together
+MODEL_FILES=['words.pkl','classes.pkl','chatbotmodel.npz','chatbotmodel.h5']
+
+class IntentModel:
+  """Vocabulary, classes and weights of one training run."""
+
+  def __init__(self,backend=CHATBOT_BACKEND):
+    with open('words.pkl','rb') as f:
+      words_data=f.read()
+    with open('classes.pkl','rb') as f:
+      classes_data=f.read()
+    with open(intent_model_path(backend),'rb') as f:
+      model_data=f.read()
+    self.version=hashlib.sha256(words_data+classes_data+model_data).hexdigest()[:12]
+    self.words=pickle.loads(words_data)
+    self.classes=pickle.loads(classes_data)
+    self.model=load_intent_model(backend)
+    # Position of every vocabulary word in the bag-of-words vector
+    self.word_index={word:i for i,word in enumerate(self.words)}
+
+  def predict(self,bows):
+    return self.model.predict(bows,verbose=0)
 
-words=pickle.load(open('words.pkl','rb'))
-classes=pickle.load(open('classes.pkl','rb'))
-model=load_model('chatbotmodel.h5')
+# The model answering messages; reload_model() replaces it as a whole, so a message
+# that has picked it up is encoded and classified by one consistent training run
+active=IntentModel()
+
+# Lowercase, drop punctuation and collapse whitespace: "What's up?" -> "what s up"
+def normalize_message(sentence):
+  return ' '.join(re.sub(r'[^\w\s]',' ',sentence.lower()).split())
+
+# Built once at load: tag -> responses, and normalized pattern -> tag for the fast path.
+# A pattern listed under more than one tag is left to the model.
+responses_by_tag={}
+pattern_tags={}
+ambiguous_patterns=set()
+for intent in intents['intents']:
+  responses_by_tag[intent['tag']]=intent['responses']
+  for pattern in intent['patterns']:
+    key=normalize_message(pattern)
+    if pattern_tags.setdefault(key,intent['tag'])!=intent['tag']:
+      ambiguous_patterns.add(key)
+for key in ambiguous_patterns:
+  del pattern_tags[key]
+
+# How many messages were answered by the pattern table vs the model
+route_counts={'fast_path':0,'model':0}
+
+def match_pattern(sentence):
+  tag=pattern_tags.get(normalize_message(sentence))
+  if tag is None:
+    return None
+  route_counts['fast_path']+=1
+  metrics.count_route('fast_path')
+  return [{'intent':tag,'probability':'1.0'}]
 
 
 def clean_up_sentence(sentence):
-  sentence_words=nltk.word_tokenize(sentence)
-  sentence_words=[lemmatizer.lemmatize(word) for word in sentence_words]
+  with metrics.stage('tokenize'):
+    sentence_words=nltk.word_tokenize(sentence)
+  with metrics.stage('lemmatize'):
+    sentence_words=[lemmatize(word) for word in sentence_words]
   return sentence_words
 
-def bag_of_words(sentence):
+def encode_into(bag,sentence,word_index):
   sentence_words=clean_up_sentence(sentence)
-  bag=[0]*len(words)
-  for w in sentence_words:
-    for i,word in enumerate(words):
-      if word == w:
+  with metrics.stage('bag_of_words'):
+    for w in sentence_words:
+      i=word_index.get(w)
+      if i is not None:
         bag[i]=1
-  return np.array(bag)
+  return bag
+
+def bag_of_words(sentence,intent_model=None):
+  intent_model=intent_model or active
+  return encode_into(np.zeros(len(intent_model.words),dtype=np.float32),sentence,intent_model.word_index)
 
-def predict_class(sentence):
-  bow=bag_of_words(sentence)
-  res=model.predict(np.array([bow]))[0]
+def intents_from_probabilities(res,classes):
   ERROR_THRESHOLD=0.25
   results=[[i,r] for i,r in enumerate(res) if r> ERROR_THRESHOLD]
 
@@ -47,14 +140,62 @@ def predict_class(sentence):
     return_list.append({'intent': classes[r[0]],'probability':str(r[1])})
   return return_list
 
+def predict_class(sentence,intent_model=None):
+  matched=match_pattern(sentence)
+  if matched is not None:
+    return matched
+  intent_model=intent_model or active
+  route_counts['model']+=1
+  metrics.count_route('model')
+  bow=bag_of_words(sentence,intent_model)
+  with metrics.stage('inference'):
+    res=intent_model.predict(np.array([bow]))[0]
+  return intents_from_probabilities(res,intent_model.classes)
+
+# Encode many messages into one matrix and run the model once (pattern matches skip it)
+def predict_class_batch(sentences,intent_model=None):
+  results=[match_pattern(sentence) for sentence in sentences]
+  pending=[i for i,r in enumerate(results) if r is None]
+  if not pending:
+    return results
+  intent_model=intent_model or active
+  route_counts['model']+=len(pending)
+  metrics.count_route('model',len(pending))
+  bows=np.zeros((len(pending),len(intent_model.words)),dtype=np.float32)
+  for row,i in enumerate(pending):
+    encode_into(bows[row],sentences[i],intent_model.word_index)
+  with metrics.stage('inference'):
+    res=intent_model.predict(bows)
+  for i,r in zip(pending,res):
+    results[i]=intents_from_probabilities(r,intent_model.classes)
+  return results
+
+# Run the tokenizer, lemmatizer and model once so the first real message pays no first-call cost
+def warm_up(intent_model=None):
+  intent_model=intent_model or active
+  clean_up_sentence('warm up the intent model')
+  intent_model.predict(np.zeros((1,len(intent_model.words)),dtype=np.float32))
+
+# Load and warm a retrained model next to the current one, then swap it in. The new
+# classes must be tags from intents.json, which is not reloaded.
+def reload_model():
+  global active
+  intent_model=IntentModel()
+  unknown=[tag for tag in intent_model.classes if tag not in responses_by_tag]
+  if unknown:
+    raise ValueError(f"Model classes missing from intents.json: {unknown}")
+  warm_up(intent_model)
+  previous,active=active,intent_model
+  metrics.set_model_version(intent_model.version)
+  print(f"Model reloaded: {previous.version} -> {intent_model.version}")
+
 def get_response(intents_list,intents_json):
   tag=intents_list[0]['intent']
-  list_of_intents=intents_json['intents']
-  for i in list_of_intents:
-    if i['tag']==tag:
-      result=random.choice(i['responses'])
-      break
-  return result
+  if intents_json is intents:
+    responses=responses_by_tag[tag]
+  else:
+    responses=next(i['responses'] for i in intents_json['intents'] if i['tag']==tag)
+  return random.choice(responses)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+import os
+
+# Production settings for the chatbot service: gunicorn -c gunicorn.conf.py main:app
+# Each worker imports main.py, which loads and warms the model before it accepts requests.
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("CHATBOT_THREADS", 4))
+timeout = int(os.environ.get("CHATBOT_TIMEOUT", 30))
+graceful_timeout = 30
+
+
+# Forget the metric files of a worker that exited (PROMETHEUS_MULTIPROC_DIR only)
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+# Install the SIGHUP reload handler once gunicorn has set up the worker's own handlers
+def post_worker_init(worker):
+    import main
+    main.model_watcher.install_signal()
@@ -1,22 +1,71 @@
-
+import os
 from flask import Flask
 from flask_cors import CORS
+import metrics
+import profiling
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument(app)  # Request counts and latencies, plus GET /metrics
+
+# On-demand profiling: requests with X-Profile-Token: $CHATBOT_PROFILE_TOKEN, or a random
+# CHATBOT_PROFILE_SAMPLE_RATE share of them, are written to CHATBOT_PROFILE_DIR
+profiling.install(
+    app,
+    token=os.environ.get("CHATBOT_PROFILE_TOKEN"),
+    sample_rate=float(os.environ.get("CHATBOT_PROFILE_SAMPLE_RATE", 0)),
+    directory=os.environ.get("CHATBOT_PROFILE_DIR", "profiles"),
+)
 
 from flask import request
 from flask import jsonify
 
+# Load intents, vocabulary and model once at start-up instead of inside the first request,
+# then warm them up; gunicorn only routes requests to a worker once this import finishes
+import chat
+from chat import get_response, predict_class, intents, warm_up
+from model_watcher import ModelWatcher
+
+warm_up()
+metrics.set_model_version(chat.active.version)
+
+# Retrained words.pkl / classes.pkl / model files are picked up every CHATBOT_MODEL_RELOAD_INTERVAL
+# seconds (0: never), or at once on SIGHUP to a worker, and swapped in without a restart
+model_watcher = ModelWatcher(
+    chat.MODEL_FILES, chat.reload_model,
+    interval=float(os.environ.get("CHATBOT_MODEL_RELOAD_INTERVAL", 5)),
+    name="chatbot-model-watcher",
+    on_outcome=metrics.count_reload,
+).start()
+
+
+@app.route('/healthz', methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+@app.route('/readyz', methods=["GET"])
+def readyz():
+    return jsonify({"status": "ready"})
+
+
 @app.route('/', methods=["POST", "GET"])
 def predict():
-    from chat import get_response
-    from chat import predict_class, intents
-    text = request.get_json().get("message")
-    ints=predict_class(text)
-    response = get_response(ints, intents)
-    message = {"answer": response}
-    return jsonify(message)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object with a message"}), 400
+    text = data.get("message")
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({"error": "No message provided"}), 400
+    current = chat.active  # Finish on this model even if a reload swaps in another
+    ints=predict_class(text, current)
+    with metrics.stage('response'):
+        response = get_response(ints, intents)
+    message = {"answer": response, "model_version": current.version}
+    with metrics.stage('serialize'):
+        return jsonify(message)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py main:app`
+    model_watcher.install_signal()
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -0,0 +1,20 @@
+from prometheus_client import Counter
+
+from flask_metrics import ServiceMetrics
+
+# Most stages take microseconds; the Keras backend and whole requests take milliseconds
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5)
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+service = ServiceMetrics('chatbot', "Time spent in each step of answering a message", STAGE_BUCKETS, REQUEST_BUCKETS)
+MESSAGES = Counter(
+    'chatbot_messages_total', "Messages classified, by route (exact pattern match or model)", ['route'])
+
+stage = service.stage
+set_model_version = service.set_model_version
+count_reload = service.count_reload
+instrument = service.instrument
+
+
+def count_route(route, n=1):
+    MESSAGES.labels(route).inc(n)
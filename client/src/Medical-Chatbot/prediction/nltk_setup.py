@@ -0,0 +1,59 @@
+import os
+import sys
+import nltk
+import nltk.tokenize.punkt
+
+# NLTK data the chatbot needs, as (downloader id, nltk.data path).
+# nltk >= 3.8.2 tokenizes with punkt_tab; older releases use the pickled punkt models.
+TOKENIZER = ('punkt_tab', 'tokenizers/punkt_tab/english/') if hasattr(nltk.tokenize.punkt, 'PunktTokenizer') \
+    else ('punkt', 'tokenizers/punkt')
+RESOURCES = [TOKENIZER, ('wordnet', 'corpora/wordnet')]
+
+# Bundled data directory, searched before the system-wide NLTK locations
+LOCAL_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+
+
+def missing_resources():
+    missing = []
+    for name, path in RESOURCES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def download(names, download_dir=LOCAL_DATA):
+    for name in names:
+        if not nltk.download(name, download_dir=download_dir, quiet=True):
+            raise LookupError(f"Could not download NLTK resource {name!r}")
+
+
+def ensure_nltk_data():
+    """Make the NLTK data available without touching the network.
+
+    Resources are looked up in ./nltk_data first and then in the usual NLTK
+    locations. Anything missing is an error unless NLTK_AUTO_DOWNLOAD=1, so a
+    deploy that forgot `python nltk_setup.py` fails at start-up rather than
+    downloading on the first request.
+    """
+    if LOCAL_DATA not in nltk.data.path:
+        nltk.data.path.insert(0, LOCAL_DATA)
+
+    missing = missing_resources()
+    if not missing:
+        return
+    if os.environ.get('NLTK_AUTO_DOWNLOAD') == '1':
+        download(missing)
+        return
+    raise LookupError(f"Missing NLTK data {missing}; run `python nltk_setup.py` to fetch it into {LOCAL_DATA}")
+
+
+# Build step: fetch the resources into ./nltk_data so the service starts offline
+if __name__ == '__main__':
+    if LOCAL_DATA not in nltk.data.path:
+        nltk.data.path.insert(0, LOCAL_DATA)
+    missing = missing_resources()
+    download(missing)
+    print(f"NLTK data ready in {LOCAL_DATA}" + (f" (downloaded {', '.join(missing)})" if missing else ""))
+    sys.exit(0)
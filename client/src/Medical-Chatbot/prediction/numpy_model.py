@@ -0,0 +1,104 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Weights of the Dense(128)-Dropout-Dense(64)-Dropout-Dense(softmax) intent model,
+# exported from chatbotmodel.h5 so chat.py can serve it without TensorFlow.
+# File layout: W0, b0, W1, b1, ... plus "activations" (one name per Dense layer).
+
+
+def relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+ACTIVATIONS = {'relu': relu, 'softmax': softmax, 'linear': lambda x: x}
+
+
+class NumpyMLP:
+    """Forward pass of the exported Dense layers; Dropout is a no-op at inference."""
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            names = [str(a) for a in data['activations']]
+            self.layers = [(data[f'W{i}'].astype(np.float32), data[f'b{i}'].astype(np.float32), ACTIVATIONS[name])
+                           for i, name in enumerate(names)]
+
+    # Same call shape as keras Model.predict so chat.py can use either backend
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        for W, b, activation in self.layers:
+            x = activation(x @ W + b)
+        return x
+
+
+def export_weights(model, path):
+    arrays, activations = {}, []
+    for layer in model.layers:
+        if not layer.get_weights():
+            continue  # Dropout
+        W, b = layer.get_weights()
+        arrays[f'W{len(activations)}'] = W
+        arrays[f'b{len(activations)}'] = b
+        activations.append(layer.get_config()['activation'])
+    np.savez(path, activations=np.array(activations), **arrays)
+
+
+def time_per_call(fn, x, repeat):
+    fn(x)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(x)
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+# Compare both backends on one-hot and random bag-of-words vectors
+def check(h5_path, npz_path, repeat=200):
+    from tensorflow.keras.models import load_model
+    from benchmarking import script_peak_rss_mb
+
+    keras_model = load_model(h5_path)
+    numpy_model = NumpyMLP(npz_path)
+    n_words = numpy_model.layers[0][0].shape[0]
+    rng = np.random.default_rng(0)
+    X = np.vstack([np.eye(n_words, dtype=np.float32),
+                   (rng.random((500, n_words)) < 0.05).astype(np.float32)])
+
+    expected = keras_model.predict(X, verbose=0)
+    actual = numpy_model.predict(X)
+    single = X[:1]
+    return {
+        "vectors": len(X),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "argmax_agreement": float((expected.argmax(1) == actual.argmax(1)).mean()),
+        "keras_predict_us": time_per_call(lambda x: keras_model.predict(x, verbose=0), single, repeat // 10 or 1),
+        "numpy_predict_us": time_per_call(numpy_model.predict, single, repeat),
+        "keras_rss_mb": script_peak_rss_mb(f"from tensorflow.keras.models import load_model; load_model({h5_path!r})"),
+        "numpy_rss_mb": script_peak_rss_mb(f"import sys; sys.path.insert(0, {sys.path[0]!r}); "
+                                          f"from numpy_model import NumpyMLP; NumpyMLP({npz_path!r})"),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export chatbotmodel.h5 to .npz and compare the two backends.")
+    parser.add_argument('--model', default='chatbotmodel.h5')
+    parser.add_argument('--output', default='chatbotmodel.npz')
+    parser.add_argument('--check', action='store_true', help="report parity, latency and memory after exporting")
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+    export_weights(load_model(args.model), args.output)
+    print(f"Exported {args.model} -> {args.output}")
+
+    if args.check:
+        report = check(args.model, args.output)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["argmax_agreement"] == 1.0 and report["max_abs_diff"] < 1e-5 else 1)
@@ -1,20 +1,38 @@
+import os
+import sys
 import nltk
-import random
+import nltk.tokenize.punkt
 import json
 import pickle
+import hashlib
+import argparse
 import numpy as np
 from nltk.stem import WordNetLemmatizer
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
-from tensorflow.keras.optimizers import SGD
 
-# If you have custom NLTK resources, add the path
-nltk.data.path.append("C:/Users/Asus/Downloads/nltk_data")
-
-# Download necessary NLTK resources (if not already downloaded)
-nltk.download('punkt')
-nltk.download('wordnet')
-nltk.download('omw-1.4')
+parser = argparse.ArgumentParser(description="Train the intent model, or reuse it when nothing it depends on changed.")
+parser.add_argument('--force', action='store_true', help="retrain even if the saved artifacts are up to date")
+parser.add_argument('--epochs', type=int, default=200, help="upper bound; early stopping usually ends sooner")
+parser.add_argument('--batch-size', type=int, default=32)
+parser.add_argument('--patience', type=int, default=15, help="epochs without improvement before stopping")
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+# Written after a successful run; holds the hash the saved artifacts were built from.
+# Commit it together with them, or every fresh checkout retrains.
+META_PATH = 'training_meta.json'
+ARTIFACTS = ['words.pkl', 'classes.pkl', 'lemmas.pkl', 'chatbotmodel.h5', 'chatbotmodel.npz']
+
+# Look for NLTK data in ./nltk_data first (or wherever NLTK_DATA points), and only
+# download resources that are actually missing
+NLTK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+nltk.data.path.insert(0, NLTK_DATA)
+tokenizer = ('punkt_tab', 'tokenizers/punkt_tab/english/') if hasattr(nltk.tokenize.punkt, 'PunktTokenizer') \
+    else ('punkt', 'tokenizers/punkt')
+for resource, path in [tokenizer, ('wordnet', 'corpora/wordnet')]:
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(resource, download_dir=NLTK_DATA, quiet=True)
 
 # Initialize lemmatizer
 lemmatizer = WordNetLemmatizer()
@@ -43,49 +61,103 @@ words = [lemmatizer.lemmatize(w.lower()) for w in words if w not in ignore_lette
 words = sorted(set(words))
 classes = sorted(set(classes))
 
-# Save vocabulary and labels
-pickle.dump(words, open('words.pkl', 'wb'))
-pickle.dump(classes, open('classes.pkl', 'wb'))
+# Everything the model depends on: the intents, the derived vocabulary and classes,
+# and the training settings. Same hash as the last run means the saved model still fits.
+hyperparameters = {'epochs': args.epochs, 'batch_size': args.batch_size, 'patience': args.patience, 'seed': args.seed}
+fingerprint = hashlib.sha256(json.dumps(
+    {'intents': intents, 'words': words, 'classes': classes, 'hyperparameters': hyperparameters},
+    sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def up_to_date():
+    if not all(os.path.exists(path) for path in ARTIFACTS + [META_PATH]):
+        return False
+    with open(META_PATH, encoding='utf-8') as f:
+        meta = json.load(f)
+    return meta.get('fingerprint') == fingerprint \
+        and load_pickle('words.pkl') == words and load_pickle('classes.pkl') == classes
 
-# Create training data
-training = []
-output_empty = [0] * len(classes)
 
-for document in documents:
-    bag = []
-    word_patterns = [lemmatizer.lemmatize(w.lower()) for w in document[0]]
-    for word in words:
-        bag.append(1 if word in word_patterns else 0)
+if not args.force and up_to_date():
+    print(f"✅ Intents unchanged ({fingerprint[:12]}), reusing {', '.join(ARTIFACTS)}")
+    sys.exit(0)
 
-    output_row = list(output_empty)
-    output_row[classes.index(document[1])] = 1
-    training.append([bag, output_row])
+# TensorFlow is only imported when there is something to train
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Dense, Dropout
+from tensorflow.keras.optimizers import SGD
+from tensorflow.keras.callbacks import EarlyStopping
 
-# Shuffle and convert to array
-random.shuffle(training)
-training = np.array(training, dtype=object)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'prediction'))
+from numpy_model import export_weights
 
-# Split training data
-train_x = list(training[:, 0])
-train_y = list(training[:, 1])
+tf.keras.utils.set_random_seed(args.seed)
+
+# Save vocabulary and labels
+pickle.dump(words, open('words.pkl', 'wb'))
+pickle.dump(classes, open('classes.pkl', 'wb'))
+
+# Save the lemma of every token seen in the patterns (as typed and lowercased) so
+# chat.py only calls WordNet for words it has never seen
+tokens = {token for document in documents for w in document[0] for token in (w, w.lower())}
+pickle.dump({token: lemmatizer.lemmatize(token) for token in tokens}, open('lemmas.pkl', 'wb'))
+
+# Create training data: one bag-of-words row and one one-hot label per pattern,
+# filled by index instead of scanning the vocabulary for every pattern
+word_index = {word: i for i, word in enumerate(words)}
+class_index = {tag: i for i, tag in enumerate(classes)}
+
+rows, cols = [], []
+for row, (word_list, _) in enumerate(documents):
+    for w in word_list:
+        col = word_index.get(lemmatizer.lemmatize(w.lower()))
+        if col is not None:
+            rows.append(row)
+            cols.append(col)
+
+train_x = np.zeros((len(documents), len(words)), dtype=np.float32)
+train_x[rows, cols] = 1
+train_y = np.zeros((len(documents), len(classes)), dtype=np.float32)
+train_y[np.arange(len(documents)), [class_index[tag] for _, tag in documents]] = 1
+
+# Reshuffled every epoch, batched and prefetched while the previous batch trains
+dataset = tf.data.Dataset.from_tensor_slices((train_x, train_y)) \
+    .shuffle(len(documents), seed=args.seed, reshuffle_each_iteration=True) \
+    .batch(args.batch_size) \
+    .prefetch(tf.data.AUTOTUNE)
 
 # Build neural network
 model = Sequential([
-    Dense(128, input_shape=(len(train_x[0]),), activation='relu'),
+    Dense(128, input_shape=(len(words),), activation='relu'),
     Dropout(0.5),
     Dense(64, activation='relu'),
     Dropout(0.5),
-    Dense(len(train_y[0]), activation='softmax')
+    Dense(len(classes), activation='softmax')
 ])
 
 # Compile model with SGD optimizer (use new version of SGD without deprecated decay parameter)
 sgd = SGD(learning_rate=0.01, momentum=0.9, nesterov=True)
 model.compile(loss='categorical_crossentropy', optimizer=sgd, metrics=['accuracy'])
 
-# Train the model
-hist = model.fit(np.array(train_x), np.array(train_y), epochs=200, batch_size=5, verbose=1)
+# Train the model; stop once the loss stops improving and keep the best weights
+early_stopping = EarlyStopping(monitor='loss', patience=args.patience, min_delta=1e-4, restore_best_weights=True)
+hist = model.fit(dataset, epochs=args.epochs, callbacks=[early_stopping], verbose=1)
 
 # Save the trained model
 model.save('chatbotmodel.h5')
-print("✅ Training Done")
+
+# Export the Dense weights for chat.py's TensorFlow-free backend
+export_weights(model, 'chatbotmodel.npz')
+
+with open(META_PATH, 'w', encoding='utf-8') as f:
+    json.dump({'fingerprint': fingerprint, 'hyperparameters': hyperparameters,
+               'epochs_run': len(hist.history['loss']), 'final_loss': float(min(hist.history['loss']))}, f, indent=2)
+
+print(f"✅ Training Done in {len(hist.history['loss'])} epochs")
 print("NLTK data paths:", nltk.data.path)  # Shows where NLTK is looking for resources
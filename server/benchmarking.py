@@ -0,0 +1,30 @@
+# Generated from shared/benchmarking.py by shared/sync.py; edit that file and re-run the script.
+
+import os
+import sys
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Nearest-rank percentile of an unsorted list of samples
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+# Peak RSS (MB) of this process so far
+def peak_rss_mb():
+    # VmHWM rather than ru_maxrss, which Linux carries over from the parent across fork/exec
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+# Peak RSS (MB) of a fresh interpreter that runs script
+def script_peak_rss_mb(script):
+    script += f"\nimport sys; sys.path.insert(0, {HERE!r}); from benchmarking import peak_rss_mb; print(peak_rss_mb())"
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return float(out.split()[-1])
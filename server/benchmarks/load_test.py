@@ -0,0 +1,243 @@
+# Offline load test for the three Python inference paths:
+#   predict      server/predict.py predict_disease (symptom KNN)
+#   skin-image   skin-predictor/app.py POST /predict-skin (phone-size JPEG uploads)
+#   skin-disease skin-predictor/app.py POST /predict-disease (symptom rules)
+#   chatbot      Medical-Chatbot/prediction/main.py POST / (messages from intents.json)
+#
+# Each target runs in its own interpreter, so cold start and peak RSS are measured
+# per target. Requests go through Flask test clients (or the function itself), so
+# nothing listens on the network. Run from the server directory:
+#   python benchmarks/load_test.py --concurrency 1,4,16 --requests 200 --output load.json
+import io
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKIN_DIR = os.path.join(SERVER_DIR, 'skin-predictor')
+CHATBOT_DIR = os.path.join(os.path.dirname(SERVER_DIR), 'client', 'src', 'Medical-Chatbot')
+
+sys.path.insert(0, SERVER_DIR)
+
+from benchmarking import percentile, peak_rss_mb  # noqa: E402
+
+TARGETS = ['predict', 'skin-image', 'skin-disease', 'chatbot']
+
+# Common phone camera resolutions (width, height), portrait and landscape
+PHONE_SIZES = [(4032, 3024), (3024, 4032), (4000, 3000), (3264, 2448), (1920, 1080), (1080, 1920)]
+
+
+# Synthetic inputs
+
+def symptom_lists(columns, n, rng):
+    return [rng.sample(columns, rng.randint(1, 6)) for _ in range(n)]
+
+
+# Smooth gradient plus sensor-like noise, so JPEG sizes are close to real photos
+def phone_photo(size, rng):
+    import numpy as np
+    from PIL import Image
+
+    width, height = size
+    gen = np.random.default_rng(rng.randrange(2 ** 32))
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+    base = gen.uniform(60, 200, 3).astype(np.float32)
+    pixels = base + 50 * x - 40 * y + gen.normal(0, 6, (height, width, 3)).astype(np.float32)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+# Half exact patterns (fast path), half with extra words so they go through the model
+def chat_messages(intents, n, rng):
+    patterns = [p for intent in intents['intents'] for p in intent['patterns']]
+    fillers = ['please', 'today', 'doctor', 'really', 'now', 'thanks']
+    messages = []
+    for _ in range(n):
+        message = rng.choice(patterns)
+        if rng.random() < 0.5:
+            message = f"{message} {rng.choice(fillers)}"
+        messages.append(message)
+    return messages
+
+
+# Targets: each returns (one-request function, list of inputs); the import inside is the cold start
+
+def setup_predict(n, rng):
+    os.chdir(SERVER_DIR)
+    sys.path.insert(0, SERVER_DIR)
+    with open('./Medical_dataset/Training.csv', newline='') as f:
+        columns = [c for c in next(csv.reader(f)) if c != 'prognosis']
+    import predict
+
+    return predict.predict_disease, symptom_lists(columns, n, rng)
+
+
+def flask_caller(app, path, payload_fn):
+    local = threading.local()
+
+    def call(item):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post(path, **payload_fn(item))
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+        return response
+
+    return call
+
+
+def setup_skin_image(n, rng, pool_size=8):
+    os.chdir(SKIN_DIR)
+    sys.path.insert(0, SKIN_DIR)
+    images = [phone_photo(PHONE_SIZES[i % len(PHONE_SIZES)], rng) for i in range(pool_size)]
+    import app as skin
+
+    call = flask_caller(skin.app, '/predict-skin',
+                        lambda data: {'data': {'image': (io.BytesIO(data), 'photo.jpg')}})
+    return call, [images[i % pool_size] for i in range(n)]
+
+
+def setup_skin_disease(n, rng):
+    os.chdir(SKIN_DIR)
+    sys.path.insert(0, SKIN_DIR)
+    import app as skin
+
+    call = flask_caller(skin.app, '/predict-disease', lambda symptoms: {'json': {'symptoms': symptoms}})
+    return call, symptom_lists(list(skin.symptom_disease_mapping), n, rng)
+
+
+def setup_chatbot(n, rng):
+    # chat.py reads its artifacts from the working directory; they live next to the training script
+    os.chdir(os.environ.get('CHATBOT_ARTIFACT_DIR', os.path.join(CHATBOT_DIR, 'training-chatbot')))
+    sys.path.insert(0, os.path.join(CHATBOT_DIR, 'prediction'))
+    with open('intents.json', encoding='utf-8') as f:
+        intents = json.load(f)
+    import main
+
+    call = flask_caller(main.app, '/', lambda message: {'json': {'message': message}})
+    return call, chat_messages(intents, n, rng)
+
+
+SETUP = {
+    'predict': setup_predict,
+    'skin-image': setup_skin_image,
+    'skin-disease': setup_skin_disease,
+    'chatbot': setup_chatbot,
+}
+
+
+def run_level(call, inputs, concurrency):
+    latencies = [0.0] * len(inputs)
+    errors = []
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            call(inputs[i])
+        except Exception as e:
+            errors.append(repr(e))
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(len(inputs))))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(inputs),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_rps": round(len(inputs) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+# Runs inside the child interpreter; spawned_at is the parent's wall clock when it started us
+def run_target(target, spawned_at, concurrency_levels, requests, seed):
+    rng = random.Random(seed)
+    setup_start = time.perf_counter()
+    call, inputs = SETUP[target](requests * len(concurrency_levels) + 1, rng)
+    setup_seconds = time.perf_counter() - setup_start
+
+    first_start = time.perf_counter()
+    call(inputs[0])
+    first_request_ms = (time.perf_counter() - first_start) * 1000
+    cold_start_seconds = time.time() - spawned_at
+
+    levels = []
+    for i, concurrency in enumerate(concurrency_levels):
+        chunk = inputs[1 + i * requests:1 + (i + 1) * requests]
+        levels.append(run_level(call, chunk, concurrency))
+
+    return {
+        "target": target,
+        "cold_start_s": round(cold_start_seconds, 3),
+        "setup_s": round(setup_seconds, 3),
+        "first_request_ms": round(first_request_ms, 3),
+        "levels": levels,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def spawn(target, args):
+    # Caches would turn repeated synthetic inputs into cache hits; measure the model unless asked not to
+    env = dict(os.environ)
+    if not args.keep_caches:
+        env.update({'PREDICT_CACHE_SIZE': '0', 'SKIN_CACHE_SIZE': '0', 'SKIN_TENSOR_CACHE_SIZE': '0'})
+    command = [sys.executable, os.path.abspath(__file__), '--child', target, '--spawned-at', repr(time.time()),
+               '--concurrency', args.concurrency, '--requests', str(args.requests), '--seed', str(args.seed)]
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"target": target, "error": result.stderr.strip().splitlines()[-1:] or ["exited with no output"]}
+    # The report is the last stdout line; the services print their own logging before it
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test the symptom, skin and chatbot inference paths offline.")
+    parser.add_argument('--targets', default=','.join(TARGETS), help=f"comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="requests per concurrency level")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-caches', action='store_true', help="leave the result caches on")
+    parser.add_argument('--output', help="also write the report to this file")
+    parser.add_argument('--child', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--spawned-at', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    if args.child:
+        report = run_target(args.child, args.spawned_at, levels, args.requests, args.seed)
+        sys.stdout.write('\n' + json.dumps(report) + '\n')
+        sys.exit(0)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "concurrency": levels,
+        "requests_per_level": args.requests,
+        "caches": "on" if args.keep_caches else "off",
+        "results": [spawn(target.strip(), args) for target in args.targets.split(',') if target.strip()],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    sys.exit(1 if any('error' in r for r in report['results']) else 0)
@@ -0,0 +1,133 @@
+# Per-worker memory of the skin predictor under gunicorn, with and without SKIN_PRELOAD.
+# Starts gunicorn on a local port, waits until every worker has loaded the model,
+# sends a few predictions, then reads /proc/<pid>/smaps_rollup for the master and
+# each worker. PSS splits shared pages between the processes that map them, so the
+# PSS total is what the node actually pays. Run from the server directory:
+#   python benchmarks/skin_worker_memory.py --workers 4
+import io
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+SKIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'skin-predictor')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    mb = lambda kb: round(kb / 1024, 1)  # noqa: E731
+    return {
+        "rss_mb": mb(fields.get('Rss', 0)),
+        "pss_mb": mb(fields.get('Pss', 0)),
+        "shared_mb": mb(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)),
+        "private_mb": mb(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)),
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def jpeg():
+    import numpy as np
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def post_image(port, data):
+    boundary = 'skinbenchboundary'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="a.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/predict-skin', data=body,
+                                     headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status
+
+
+def measure(preload, workers, requests, startup_timeout):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), SKIN_PRELOAD='1' if preload else '0',
+               SKIN_CACHE_SIZE='0')
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    started = time.time()
+    log = tempfile.TemporaryFile()  # gunicorn and TF log to stderr; a pipe nobody reads would fill up
+    master = subprocess.Popen(command, cwd=SKIN_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log)
+    try:
+        # post_fork loads the model before a worker accepts requests; wait for every worker
+        # to exist and for /readyz to answer
+        deadline = time.time() + startup_timeout
+        while time.time() < deadline:
+            if master.poll() is not None:
+                log.seek(0)
+                raise RuntimeError(log.read().decode(errors='replace')[-2000:])
+            pids = children(master.pid)
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/readyz', timeout=2) as response:
+                    ready = response.status == 200
+            except OSError:
+                ready = False
+            if ready and len(pids) == workers:
+                break
+            time.sleep(0.5)
+        else:
+            raise RuntimeError(f"workers not ready after {startup_timeout}s")
+        time.sleep(2)  # Let the remaining workers finish warm-up
+        ready_seconds = time.time() - started
+
+        data = jpeg()
+        statuses = [post_image(port, data) for _ in range(requests)]
+
+        worker_stats = [smaps_rollup(pid) for pid in children(master.pid)]
+        master_stats = smaps_rollup(master.pid)
+        return {
+            "preload": preload,
+            "workers": workers,
+            "ready_s": round(ready_seconds, 2),
+            "requests_ok": statuses.count(200),
+            "master": master_stats,
+            "per_worker": worker_stats,
+            "worker_mean_rss_mb": round(sum(w["rss_mb"] for w in worker_stats) / len(worker_stats), 1),
+            "worker_mean_pss_mb": round(sum(w["pss_mb"] for w in worker_stats) / len(worker_stats), 1),
+            "total_pss_mb": round(master_stats["pss_mb"] + sum(w["pss_mb"] for w in worker_stats), 1),
+        }
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+        log.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare skin predictor worker memory with and without preload.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--requests', type=int, default=20, help="predictions sent before measuring")
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    results = [measure(preload, args.workers, args.requests, args.startup_timeout) for preload in (False, True)]
+    report = {"workers": args.workers, "runs": results,
+              "total_pss_saved_mb": round(results[0]["total_pss_mb"] - results[1]["total_pss_mb"], 1)}
+    print(json.dumps(report, indent=2))
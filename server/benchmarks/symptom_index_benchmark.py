@@ -0,0 +1,81 @@
+# Compare the SymptomIndex differential with the KNN path in predict.py.
+# Run from the server directory: python benchmarks/symptom_index_benchmark.py
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import predict  # noqa: E402  (loads the KNN model and the symptom index)
+from benchmarking import percentile  # noqa: E402
+
+
+def summarize(samples):
+    return {
+        "mean_us": round(sum(samples) / len(samples) * 1e6, 2),
+        "p50_us": round(percentile(samples, 50) * 1e6, 2),
+        "p99_us": round(percentile(samples, 99) * 1e6, 2),
+    }
+
+
+def time_each(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# Sample 1-6 symptoms from random Training.csv rows so queries look like real intake
+def sample_queries(index, n, seed):
+    rng = random.Random(seed)
+    rows = index.matrix.nonzero()
+    by_row = {}
+    for row, column in zip(*rows):
+        by_row.setdefault(int(row), []).append(index.symptoms[column])
+
+    queries = []
+    for _ in range(n):
+        symptoms = by_row[rng.choice(list(by_row))]
+        queries.append(rng.sample(symptoms, rng.randint(1, min(6, len(symptoms)))))
+    return queries
+
+
+def knn_predict(symptoms):
+    return predict.model.predict(predict.model.vectorize([' '.join(symptoms)]))[0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark SymptomIndex against the KNN prediction path.")
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    index = predict.symptom_index
+    queries = sample_queries(index, args.queries, args.seed)
+    parsed = [predict.preprocess_symptoms(q) for q in queries]
+
+    # Warm both paths once so first-call setup is not counted
+    index.query(parsed[0], args.top_k)
+    knn_predict(parsed[0])
+
+    start = time.perf_counter()
+    index.query_batch(parsed, args.top_k)
+    batch_seconds = time.perf_counter() - start
+
+    report = {
+        "queries": len(queries),
+        "index_rows": int(index.matrix.shape[0]),
+        "symptoms": len(index.symptoms),
+        "diseases": len(index.diseases),
+        "symptom_index_top_k": summarize(time_each(lambda q: index.query(q, args.top_k), parsed)),
+        "symptom_index_batch_per_query_us": round(batch_seconds / len(parsed) * 1e6, 2),
+        "knn_predict": summarize(time_each(knn_predict, parsed)),
+        "knn_backend": type(predict.model).__name__,
+    }
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,140 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from records import read_records, write_results
+
+# Streaming bulk scoring for exports too large for predict.py --batch.
+#
+# The parent reads the input lazily in chunks of --chunk-size records and keeps at
+# most --max-in-flight chunks submitted to a pool of worker processes; each worker
+# imports predict.py (and so loads the model) once. Workers return their chunk
+# already formatted, and the parent writes chunks strictly in input order, so
+# memory depends on chunk size and pool size, not on the input.
+#
+# After every chunk the output is flushed and a checkpoint records how many input
+# records are done and how long the output is. --resume truncates the output to
+# that length and skips the records already scored.
+
+
+def init_worker():
+    global predict
+    import predict
+
+
+# Score one chunk of (id, symptoms) records and return the formatted output
+def score_chunk(chunk, top_k, as_csv):
+    results = predict.predict_diseases([symptoms for _, symptoms in chunk], top_k)
+    out = io.StringIO()
+    write_results(zip((record_id for record_id, _ in chunk), results), out, as_csv=as_csv, header=False)
+    return out.getvalue()
+
+
+def chunked(records, size):
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_checkpoint(path, input_path, output_path):
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != os.path.abspath(input_path) or checkpoint.get('output') != os.path.abspath(output_path):
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint.get('input')} -> {checkpoint.get('output')}")
+    return checkpoint
+
+
+# Written to a temporary file and renamed, so a crash never leaves half a checkpoint
+def save_checkpoint(path, input_path, output_path, records_done, output_bytes):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({
+            'input': os.path.abspath(input_path),
+            'output': os.path.abspath(output_path),
+            'records_done': records_done,
+            'output_bytes': output_bytes,
+            'updated_at': time.time(),
+        }, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def bulk_score(input_path, output_path, workers=None, chunk_size=2000, max_in_flight=None, top_k=5,
+               checkpoint_path=None, resume=False, log=sys.stderr):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    as_csv = output_path.lower().endswith('.csv')
+
+    records_done, output_bytes = 0, 0
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path, input_path, output_path)
+        records_done, output_bytes = checkpoint['records_done'], checkpoint['output_bytes']
+        print(f"Resuming after {records_done} records", file=log)
+
+    # Anything past the checkpointed length was written by chunks that were never recorded as done
+    mode = 'r+' if output_bytes else 'w'
+    with open(output_path, mode, newline='', encoding='utf-8') as out:
+        out.truncate(output_bytes)
+        out.seek(output_bytes)
+        if as_csv and output_bytes == 0:
+            write_results([], out, as_csv=True)
+
+        records = itertools.islice(read_records(input_path), records_done, None)
+        pending = deque()
+        started = reported = time.time()
+        scored = 0
+
+        def write_oldest():
+            nonlocal records_done, scored, reported
+            size, future = pending.popleft()
+            out.write(future.result())
+            out.flush()
+            records_done += size
+            scored += size
+            save_checkpoint(checkpoint_path, input_path, output_path, records_done, out.tell())
+            if time.time() - reported >= 5:
+                reported = time.time()
+                print(f"{records_done} records scored ({scored / (reported - started):.0f}/s)", file=log)
+
+        # spawn rather than fork: each worker starts clean and loads the model itself
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker) as pool:
+            for chunk in chunked(records, chunk_size):
+                pending.append((len(chunk), pool.submit(score_chunk, chunk, top_k, as_csv)))
+                if len(pending) >= max_in_flight:
+                    write_oldest()
+            while pending:
+                write_oldest()
+
+    # Finished: nothing left to resume
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return records_done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score a large CSV or JSONL symptom file with a pool of worker processes.")
+    parser.add_argument('input', help="CSV with a 'symptoms' column (optional 'id'), or JSONL records")
+    parser.add_argument('--output', required=True, help="JSONL, or CSV when the name ends in .csv")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="records per task")
+    parser.add_argument('--max-in-flight', type=int, help="chunks submitted but not yet written (default: 2 x workers)")
+    parser.add_argument('--top-k', type=int, default=5, help="size of the differential, 0 to skip it")
+    parser.add_argument('--checkpoint', help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument('--resume', action='store_true', help="continue from the checkpoint instead of starting over")
+    args = parser.parse_args()
+
+    total = bulk_score(args.input, args.output, args.workers, args.chunk_size, args.max_in_flight, args.top_k,
+                       args.checkpoint, args.resume)
+    print(f"Done: {total} records written to {args.output}", file=sys.stderr)
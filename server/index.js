@@ -1,6 +1,5 @@
 const express = require("express");
 const bodyParser = require('body-parser');
-const { PythonShell } = require('python-shell');
 
 const mongoose = require("mongoose");
 const User = require("./models/user");
@@ -16,7 +15,7 @@ const appointmentRouter = require("./routes/appointments/appointment");
 const emergencyRouter = require("./routes/hospital/hospitalapi");
 const otherroutes = require("./routes/otherroutes/otherroutes");
 const client = require("prom-client");
-const { connectDB, corsConfig } = require("./utils");
+const { connectDB, corsConfig, predictDisease, reloadPredictModel, startPredictWorker } = require("./utils");
 const Hospital = require("./models/hospital");
 const { createUserFromGoogleSignIn } = require("./controllers/auth/authController");
 const emergencyRoute = require('./routes/emergency');
@@ -86,28 +85,25 @@ app.post('/predict-disease', (req, res) => {
   console.log('Received name:', name);
   console.log('Received symptoms:', symptoms);
   
-  let options = {
-    args: [JSON.stringify(symptoms)]  // Pass symptoms as a valid JSON array string
-};
-
-  PythonShell.run('predict.py', options, (err, result) => {
-    if (err) {
+  // Answered by the long-running predict.py worker instead of a new Python per call
+  predictDisease(symptoms)
+    .then((prediction) => {
+      console.log('Prediction result:', prediction);
+
+      res.json({
+        name,
+        disease: prediction.disease,
+        description: prediction.description,
+        precautions: prediction.precautions,
+        differential: prediction.differential,
+        matched_symptoms: prediction.matched_symptoms,
+        model_version: prediction.model_version
+      });
+    })
+    .catch((err) => {
       console.error('Error running Python script:', err);
       res.status(500).send({ error: 'Prediction failed' });
-      return;
-    }
-
-    console.log('Prediction result:', result);
-
-    // Assuming result is in the format { disease, description, precautions }
-    const prediction = JSON.parse(result[0]);
-    res.json({
-      name,
-      disease: prediction.disease,
-      description: prediction.description,
-      precautions: prediction.precautions
     });
-  });
 });
 
 // Google Auth Routes
@@ -238,4 +234,12 @@ app._router.stack.forEach((r) => {
 // Start Server
 app.listen(port, () => {
   console.log(`Server is running on port ${port}`);
+  startPredictWorker(); // Load the model before the first /predict-disease call
+});
+
+// `kill -HUP <pid>` after deploying new model files: the worker reloads them in the background
+process.on("SIGHUP", () => {
+  reloadPredictModel()
+    .then((reply) => console.log("Model reload requested, serving", reply.model_version))
+    .catch((err) => console.error("Model reload request failed:", err));
 });
@@ -0,0 +1,69 @@
+import os
+import sys
+from contextlib import nullcontext
+
+# Prometheus metrics for predict.py --serve. They are recorded only when
+# PREDICT_METRICS_PORT is set (the --serve worker then exposes /metrics on that
+# port); the CLI and bulk scoring skip them, and prometheus_client is optional.
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+PORT = os.environ.get('PREDICT_METRICS_PORT')
+enabled = bool(PORT) and prometheus_client is not None
+if PORT and prometheus_client is None:
+    print("PREDICT_METRICS_PORT is set but prometheus_client is not installed; metrics are off", file=sys.stderr)
+
+# Stages run from a few microseconds (cache lookup) to tens of milliseconds (large batches)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+if enabled:
+    STAGE_SECONDS = prometheus_client.Histogram(
+        'predict_stage_seconds', "Time spent in each prediction stage", ['stage'], buckets=STAGE_BUCKETS)
+    REQUESTS = prometheus_client.Counter(
+        'predict_requests_total', "Requests answered by the --serve worker, by outcome", ['outcome'])
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        'predict_cache_lookups_total', "Prediction cache lookups", ['result'])
+    BATCH_SIZE = prometheus_client.Histogram(
+        'predict_model_batch_size', "Symptom sets per model call", buckets=(1, 2, 4, 8, 16, 64, 256, 1024, 5000))
+    MODEL_INFO = prometheus_client.Gauge(
+        'predict_model_info', "Model version currently serving (value is always 1)", ['version'])
+    RELOADS = prometheus_client.Counter(
+        'predict_model_reloads_total', "Model hot-reload attempts, by outcome", ['outcome'])
+
+
+def stage(name):
+    return STAGE_SECONDS.labels(name).time() if enabled else nullcontext()
+
+
+def count_request(outcome):
+    if enabled:
+        REQUESTS.labels(outcome).inc()
+
+
+def count_cache(hits, misses):
+    if enabled:
+        CACHE_LOOKUPS.labels('hit').inc(hits)
+        CACHE_LOOKUPS.labels('miss').inc(misses)
+
+
+def observe_batch(size):
+    if enabled:
+        BATCH_SIZE.observe(size)
+
+
+def set_model_version(version):
+    if enabled:
+        MODEL_INFO.clear()
+        MODEL_INFO.labels(version).set(1)
+
+
+def count_reload(outcome):
+    if enabled:
+        RELOADS.labels(outcome).inc()
+
+
+def start_server():
+    if enabled:
+        prometheus_client.start_http_server(int(PORT), addr=os.environ.get('PREDICT_METRICS_ADDR', '0.0.0.0'))
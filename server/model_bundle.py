@@ -0,0 +1,283 @@
+import os
+import re
+import csv
+import sys
+import json
+import mmap
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+
+# Compiled symptom model: vocabulary, IDF weights and the KNN reference matrix in
+# one file that predict.py memory-maps. Layout:
+#   MAGIC | uint32 format version | uint32 header size | JSON header | aligned arrays
+MAGIC = b'SBMODEL\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# CountVectorizer defaults used by predict.py
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+VOCAB_SIZE = 132
+
+SUPPORTED_METRICS = ('euclidean', 'cosine')
+
+
+# Read the vocabulary from the CSV header only; there is no need to parse the rows
+def read_vocabulary(path, size=VOCAB_SIZE):
+    with open(path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))[:size]
+
+
+def file_digest(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_bundle(path, metadata, arrays):
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({"metadata": metadata, "arrays": table}).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    # Written next to the target and renamed over it: a running predict.py has the old
+    # file memory-mapped, and truncating that file in place kills it with SIGBUS
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.array([FORMAT_VERSION, len(header)], dtype='<u4').tobytes())
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + table[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _knn_metric(knn):
+    metric = knn.effective_metric_
+    if metric == 'minkowski':
+        metric = {2: 'euclidean'}.get(knn.effective_metric_params_.get('p', knn.p))
+    if metric not in SUPPORTED_METRICS:
+        raise ValueError(f"Unsupported KNN metric {knn.effective_metric_!r}; expected one of {SUPPORTED_METRICS}")
+    if knn.weights not in ('uniform', 'distance'):
+        raise ValueError("Only 'uniform' and 'distance' KNN weights can be compiled")
+    return metric
+
+
+# Compile knn.pkl plus the tfidf vocabulary into a bundle (needs joblib/sklearn, serving does not)
+def build_bundle(knn_path, vocab_path, output_path):
+    import joblib
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+    knn = joblib.load(knn_path)
+    vocab = read_vocabulary(vocab_path)
+    count_vect = CountVectorizer(vocabulary=vocab)
+    tfidf_transformer = TfidfTransformer().fit(count_vect.transform(['']))
+
+    fit_X = knn._fit_X
+    fit_X = np.asarray(fit_X.toarray() if hasattr(fit_X, 'toarray') else fit_X, dtype=np.float64)
+    if fit_X.shape[1] != len(vocab):
+        raise ValueError(f"Feature size mismatch. Vocabulary has {len(vocab)} terms, model expects {fit_X.shape[1]}.")
+
+    metric = _knn_metric(knn)
+    if metric == 'cosine':
+        norms = np.linalg.norm(fit_X, axis=1, keepdims=True)
+        fit_X = fit_X / np.where(norms == 0, 1, norms)
+
+    metadata = {
+        "model_version": file_digest(knn_path, vocab_path)[:16],
+        "vocabulary": vocab,
+        "classes": [str(c) for c in knn.classes_],
+        "n_neighbors": int(knn.n_neighbors),
+        "weights": knn.weights,
+        "metric": metric,
+        "token_pattern": TOKEN_PATTERN,
+        "norm": tfidf_transformer.norm,
+    }
+    arrays = {
+        "idf": tfidf_transformer.idf_.astype(np.float64),
+        "fit_X": fit_X,
+        "fit_sq_norms": np.einsum('ij,ij->i', fit_X, fit_X),
+        "fit_y": np.asarray(knn._y, dtype=np.int32),
+    }
+    write_bundle(output_path, metadata, arrays)
+    return metadata
+
+
+class ModelBundle:
+    """Serving-side view of a compiled bundle; arrays are read-only views of the mmap."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled model bundle")
+        version, header_size = np.frombuffer(self._mmap, dtype='<u4', count=2, offset=len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format version {version}, expected {FORMAT_VERSION}")
+
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_size].decode('utf-8'))
+        data_start = _align(header_start + header_size)
+
+        self.path = path
+        self.metadata = header["metadata"]
+        self.arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            array = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=data_start + spec["offset"])
+            self.arrays[name] = array.reshape(spec["shape"])
+
+        self.version = self.metadata["model_version"]
+        self.vocabulary = {term: i for i, term in enumerate(self.metadata["vocabulary"])}
+        self.classes_ = np.array(self.metadata["classes"], dtype=object)
+        self.n_features_in_ = self.arrays["fit_X"].shape[1]
+        self._token_re = re.compile(self.metadata["token_pattern"])
+
+    # Same output as CountVectorizer + TfidfTransformer, as a dense float64 matrix
+    def vectorize(self, texts):
+        X = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float64)
+        for row, text in enumerate(texts):
+            for token in self._token_re.findall(text.lower()):
+                column = self.vocabulary.get(token)
+                if column is not None:
+                    X[row, column] += 1
+        X *= self.arrays["idf"]
+        if self.metadata["norm"] == 'l2':
+            norms = np.linalg.norm(X, axis=1, keepdims=True)
+            X /= np.where(norms == 0, 1, norms)
+        return X
+
+    # Computed in the same order as sklearn's pairwise_distances (squared for euclidean), so
+    # points at equal distance compare equal here too and neighbour ties resolve the same way
+    def _distances(self, X):
+        fit_X = self.arrays["fit_X"]
+        metric = self.metadata["metric"]
+        if metric == 'euclidean':
+            sq = -2 * (X @ fit_X.T)
+            sq += np.einsum('ij,ij->i', X, X)[:, None]
+            sq += self.arrays["fit_sq_norms"]
+            return np.maximum(sq, 0, out=sq)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        distances = (X / np.where(norms == 0, 1, norms)) @ fit_X.T
+        distances *= -1
+        distances += 1
+        return np.clip(distances, 0, 2, out=distances)
+
+    def predict(self, X):
+        distances = self._distances(np.asarray(X, dtype=np.float64))
+        k = min(self.metadata["n_neighbors"], distances.shape[1])
+        # Training rows tied with the k-th neighbour are not interchangeable: they can carry
+        # different labels. sklearn's brute force (used for the sparse tfidf matrix knn.pkl
+        # is fitted on) keeps whichever ones this same argpartition call puts first, so
+        # repeat it on identically computed distances. verify_bundle() checks the result.
+        neighbors = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        labels = self.arrays["fit_y"][neighbors]
+
+        if self.metadata["weights"] == 'distance':
+            d = np.take_along_axis(distances, neighbors, axis=1)
+            if self.metadata["metric"] == 'euclidean':
+                d = np.sqrt(d)
+            with np.errstate(divide='ignore'):
+                weights = 1 / d
+            exact = np.isinf(weights)
+            weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+        else:
+            weights = np.ones_like(labels, dtype=np.float64)
+
+        # Vote ties go to the lowest class, as in sklearn
+        votes = np.zeros((len(labels), len(self.classes_)))
+        np.add.at(votes, (np.arange(len(labels))[:, None], labels), weights)
+        return self.classes_[votes.argmax(axis=1)]
+
+
+class SklearnModel:
+    """Fallback when no bundle has been built: the original joblib/sklearn path."""
+
+    def __init__(self, knn_path, vocab_path):
+        import joblib
+        from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+        self.knn = joblib.load(knn_path)
+        vocabulary = read_vocabulary(vocab_path)
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.count_vect = CountVectorizer(vocabulary=vocabulary)
+        self.tfidf_transformer = TfidfTransformer().fit(self.count_vect.transform(['']))
+        self.version = file_digest(knn_path, vocab_path)[:16]
+        self.n_features_in_ = self.knn.n_features_in_
+
+    def vectorize(self, texts):
+        return self.tfidf_transformer.transform(self.count_vect.transform(texts))
+
+    def predict(self, X):
+        return self.knn.predict(X)
+
+
+# Compare bundle and sklearn predictions on every Training.csv row and on `samples` random
+# combinations of 1-6 of its symptoms, which unlike the rows often tie between neighbours
+def verify_bundle(bundle_path, knn_path, vocab_path, training_path, samples=5000, seed=0):
+    bundle = ModelBundle(bundle_path)
+    reference = SklearnModel(knn_path, vocab_path)
+    with open(training_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [' '.join(name.replace('_', ' ') for name, value in zip(header, row) if value.strip() == '1')
+                for row in reader]
+    names = [name.replace('_', ' ') for name in header if name.strip() and name != 'prognosis']
+    rng = np.random.default_rng(seed)
+    sampled = [' '.join(rng.choice(names, size=rng.integers(1, 7), replace=False)) for _ in range(samples)]
+
+    report = {}
+    for source, texts in (("training_rows", rows), ("random_subsets", sampled)):
+        expected = reference.predict(reference.vectorize(texts))
+        actual = bundle.predict(bundle.vectorize(texts))
+        mismatches = [{"symptoms": text, "sklearn": str(b), "bundle": str(a)}
+                      for text, a, b in zip(texts, actual, expected) if str(a) != str(b)]
+        report[source] = {"queries": len(texts), "disagree": len(mismatches), "examples": mismatches[:5]}
+    report["agree"] = all(result["disagree"] == 0 for result in report.values())
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile knn.pkl and the tfidf vocabulary into a model bundle.")
+    parser.add_argument('--knn', default='./model/knn.pkl')
+    parser.add_argument('--vocab', default='./Medical_dataset/tfidfsymptoms.csv')
+    parser.add_argument('--output', default='./model/symptom_model.bin')
+    parser.add_argument('--verify', metavar='TRAINING_CSV', nargs='?', const='./Medical_dataset/Training.csv',
+                        help="check the bundle against sklearn on a one-hot symptom CSV and random symptom sets from it")
+    parser.add_argument('--verify-samples', type=int, default=5000,
+                        help="random symptom sets to compare with --verify")
+    args = parser.parse_args()
+
+    metadata = build_bundle(args.knn, args.vocab, args.output)
+    print(json.dumps({"output": args.output, "model_version": metadata["model_version"]}))
+
+    if args.verify:
+        report = verify_bundle(args.output, args.knn, args.vocab, args.verify, args.verify_samples)
+        print(json.dumps(report))
+        sys.exit(0 if report["agree"] else 1)
@@ -1,63 +1,303 @@
+import os
 import sys
 import json
-import joblib
-import pandas as pd
+import argparse
 import warnings
-from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+import threading
+import metrics
+from model_bundle import ModelBundle, SklearnModel, file_digest
+from model_watcher import ModelWatcher
+from prediction_cache import PredictionCache, canonical_symptoms
+from records import read_records, write_results
+from symptom_index import SymptomIndex
+from symptom_matcher import SymptomMatcher
 
 warnings.filterwarnings("ignore")
 
-# Load the model
-knn = joblib.load('./model/knn.pkl')
+MODEL_BUNDLE_PATH = os.environ.get('PREDICT_MODEL_BUNDLE', './model/symptom_model.bin')
+KNN_PATH = './model/knn.pkl'
+VOCAB_PATH = './Medical_dataset/tfidfsymptoms.csv'
+MODEL_FILES = [MODEL_BUNDLE_PATH, KNN_PATH, VOCAB_PATH]
 
-# Load vocabulary
-df = pd.read_csv('./Medical_dataset/tfidfsymptoms.csv')
-vocab = list(df.columns)[:132]  # ❗ Adjust to expected size, make sure it matches the training size
+# Load the model: the compiled bundle (see model_bundle.py) is memory-mapped and needs
+# neither pandas nor sklearn; without it fall back to knn.pkl and the tfidf vocabulary.
+# A bundle compiled from an older knn.pkl or vocabulary is not used: serving it would
+# silently drop the model update, so load knn.pkl until the bundle is rebuilt.
+def load_model():
+    if os.path.exists(MODEL_BUNDLE_PATH):
+        bundle = ModelBundle(MODEL_BUNDLE_PATH)
+        if not os.path.exists(KNN_PATH):
+            return bundle
+        current = file_digest(KNN_PATH, VOCAB_PATH)[:16]
+        if bundle.version == current:
+            return bundle
+        print(f"{MODEL_BUNDLE_PATH} was built from model {bundle.version}, but knn.pkl is {current}; "
+              f"loading knn.pkl (rebuild with: python model_bundle.py)", file=sys.stderr)
+    return SklearnModel(KNN_PATH, VOCAB_PATH)
 
-# Create vectorizer (use the same vocabulary as the one used during training)
-count_vect = CountVectorizer(vocabulary=vocab)
-tfidf_transformer = TfidfTransformer()
+model = load_model()
 
-# Fit the tfidf_transformer once, not every time you make a prediction
-tfidf_transformer.fit(count_vect.transform(['']))  # Fit with an empty input
+# Symptom-similarity index used for the ranked differential diagnosis
+symptom_index = SymptomIndex.from_csv('./Medical_dataset/Training.csv')
+
+# Maps typos and everyday wording ("headake", "stomach ache") onto known symptoms before
+# vectorizing, using the vocabulary of the model being served; PREDICT_FUZZY_MATCH=0 turns it off
+def load_matcher(model):
+    if os.environ.get('PREDICT_FUZZY_MATCH', '1') == '0':
+        return None
+    return SymptomMatcher.from_csv(
+        './Medical_dataset/Training.csv', model.vocabulary,
+        min_confidence=float(os.environ.get('PREDICT_FUZZY_MIN_CONFIDENCE', 0.75)),
+    )
+
+symptom_matcher = load_matcher(model)
+
+# Results cache, keyed by symptom set and scoped to the model + index version.
+# PREDICT_CACHE_DB points several workers at one shared SQLite file.
+INDEX_VERSION = file_digest('./Medical_dataset/Training.csv')[:16]
+prediction_cache = PredictionCache(
+    version=f"{model.version}:{INDEX_VERSION}",
+    max_entries=int(os.environ.get('PREDICT_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('PREDICT_CACHE_TTL', 3600)),
+    db_path=os.environ.get('PREDICT_CACHE_DB') or None,
+)
+
+# Held while the --serve loop answers a request, so a reload swaps the model (and the
+# cache version with it) only between requests
+model_lock = threading.Lock()
+
+# Load and warm a new model off the request path, then swap it in
+def reload_model():
+    global model, symptom_matcher
+    new_model = load_model()
+    new_matcher = load_matcher(new_model)
+    X = new_model.vectorize(['warm up'])
+    if X.shape[1] != new_model.n_features_in_:
+        raise ValueError(f"Feature size mismatch. X has {X.shape[1]} features, expected {new_model.n_features_in_}.")
+    new_model.predict(X)
+
+    with model_lock:
+        previous, model, symptom_matcher = model, new_model, new_matcher
+        prediction_cache.set_version(f"{new_model.version}:{INDEX_VERSION}")
+    metrics.set_model_version(new_model.version)
+    print(f"Model reloaded: {previous.version} -> {new_model.version}", file=sys.stderr)
+
+# In --serve mode the model files are polled every PREDICT_RELOAD_INTERVAL seconds (0: never)
+# and reloaded when they change; SIGHUP or an {"op": "reload"} request reloads at once.
+# The current bundle is memory-mapped: model_bundle.py writes a new one beside it and renames it
+# into place, and a bundle copied in by hand must be moved (mv) over it the same way.
+model_watcher = ModelWatcher(
+    MODEL_FILES, reload_model,
+    interval=float(os.environ.get('PREDICT_RELOAD_INTERVAL', 5)),
+    name='predict-model-watcher',
+    on_outcome=metrics.count_reload,
+)
+
+# Parse input: index.js sends a JSON array, the CLI usually gets "fever, cough"
+def parse_symptom_input(symptom_input):
+    if isinstance(symptom_input, list):
+        return [str(sym) for sym in symptom_input]
+
+    text = str(symptom_input).strip()
+    if text.startswith('['):
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list):
+            return [str(sym) for sym in parsed]
+
+    return text.split(',')
 
 # Preprocess
 def preprocess_symptoms(symptoms):
     return [sym.strip().lower().replace('_', ' ') for sym in symptoms]
 
-# Predict
-def predict_disease(symptom_input):
-    symptoms = preprocess_symptoms(symptom_input.split(','))
-    input_text = ' '.join(symptoms)
+# Build the response for one predicted label
+def build_result(disease, differential=None):
+    result = {
+        "disease": str(disease),
+        "description": f"{disease} is a predicted condition based on your symptoms.",
+        "precautions": ["Drink fluids", "Rest", "Consult a physician"]
+    }
+    if differential is not None:
+        result["differential"] = differential
+    return result
 
-    # Transform the input text using the count vectorizer
-    count_matrix = count_vect.transform([input_text])
-    
-    # Use transform, not fit_transform
-    X = tfidf_transformer.transform(count_matrix)
+# Run the model on symptom lists that are not cached, one vectorizer pass and one classifier call.
+# top_k > 0 adds the k most similar diseases from symptom_index to every result.
+def run_model(parsed, top_k):
+    texts = [' '.join(symptoms) for symptoms in parsed]
+    metrics.observe_batch(len(texts))
+
+    # Vectorize the whole batch into one matrix
+    with metrics.stage('vectorize'):
+        X = model.vectorize(texts)
 
     # Check if feature size matches the model's expected input
-    if X.shape[1] != knn.n_features_in_:
-        return {"error": f"Feature size mismatch. X has {X.shape[1]} features, expected {knn.n_features_in_}."}
+    if X.shape[1] != model.n_features_in_:
+        error = {"error": f"Feature size mismatch. X has {X.shape[1]} features, expected {model.n_features_in_}."}
+        return [dict(error) for _ in texts]
 
-    prediction = knn.predict(X)
-    disease = prediction[0]
+    with metrics.stage('inference'):
+        predictions = model.predict(X)
+    if top_k <= 0:
+        return [build_result(disease) for disease in predictions]
 
-    return {
-        "disease": disease,
-        "description": f"{disease} is a predicted condition based on your symptoms.",
-        "precautions": ["Drink fluids", "Rest", "Consult a physician"]
-    }
+    with metrics.stage('differential'):
+        differentials = symptom_index.query_batch(parsed, top_k)
+    return [build_result(d, differential) for d, differential in zip(predictions, differentials)]
+
+# Predict many inputs; only distinct symptom sets that miss the cache reach the model
+def predict_diseases(symptom_lists, top_k=5):
+    with metrics.stage('parse'):
+        parsed = [preprocess_symptoms(parse_symptom_input(s)) for s in symptom_lists]
+    matches = None
+    matcher = symptom_matcher
+    if matcher is not None:
+        with metrics.stage('match'):
+            normalized = [matcher.normalize(symptoms) for symptoms in parsed]
+        parsed = [symptoms for symptoms, _ in normalized]
+        matches = [report for _, report in normalized]
+    parsed = [canonical_symptoms(symptoms) for symptoms in parsed]
+    keys = [json.dumps([top_k, symptoms]) for symptoms in parsed]
+    if prediction_cache.enabled:
+        with metrics.stage('cache'):
+            results = [prediction_cache.get(key) for key in keys]
+        hits = sum(result is not None for result in results)
+        metrics.count_cache(hits, len(results) - hits)
+    else:
+        results = [None] * len(keys)
+
+    missing = {}
+    for key, symptoms, result in zip(keys, parsed, results):
+        if result is None:
+            missing.setdefault(key, symptoms)
+
+    if missing:
+        for key, result in zip(list(missing), run_model(list(missing.values()), top_k)):
+            if "error" not in result:
+                prediction_cache.put(key, result)
+            missing[key] = result
+
+    results = [dict(result if result is not None else missing[key]) for key, result in zip(keys, results)]
+
+    # How each input was read; added after the cache, which is keyed by the matched symptoms
+    if matches is not None:
+        for result, report in zip(results, matches):
+            result["matched_symptoms"] = report
+    return results
+
+# Predict
+def predict_disease(symptom_input, top_k=5):
+    return predict_diseases([symptom_input], top_k)[0]
+
+# Score a whole file, predicting batch_size records per classifier call
+def score_file(input_path, out, batch_size=5000):
+    def scored():
+        chunk = []
+        for record in read_records(input_path):
+            chunk.append(record)
+            if len(chunk) >= batch_size:
+                yield from zip((r[0] for r in chunk), predict_diseases([r[1] for r in chunk]))
+                chunk = []
+        if chunk:
+            yield from zip((r[0] for r in chunk), predict_diseases([r[1] for r in chunk]))
+
+    write_results(scored(), out)
+
+# Handle one line of the --serve protocol and return the response object
+def handle_request(line):
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {"id": None, "error": f"Invalid JSON request: {e}"}
+
+    # A bare array is the same payload index.js passes on the command line
+    if isinstance(request, list):
+        request = {"symptoms": request}
+    if not isinstance(request, dict):
+        return {"id": None, "error": "Request must be a JSON object or array"}
+
+    request_id = request.get("id")
+    top_k = request.get("top_k", 5)
+    if request.get("op") == "ping":
+        return {"id": request_id, "ok": True}
+    if request.get("op") == "stats":
+        return {"id": request_id, "model_version": model.version, "cache": prediction_cache.report(),
+                "reload": model_watcher.report()}
+    if request.get("op") == "reload":
+        model_watcher.request()
+        return {"id": request_id, "ok": True, "model_version": model.version}
+
+    if isinstance(request.get("batch"), list):
+        try:
+            return {"id": request_id, "model_version": model.version,
+                    "results": predict_diseases(request["batch"], top_k)}
+        except Exception as e:
+            return {"id": request_id, "error": str(e)}
+
+    symptoms = request.get("symptoms")
+    if symptoms is None:
+        return {"id": request_id, "error": "No symptoms provided"}
+
+    try:
+        result = predict_disease(symptoms, top_k)
+    except Exception as e:
+        result = {"error": str(e)}
+
+    response = {"id": request_id}
+    response.update(result)
+    response["model_version"] = model.version
+    return response
+
+# Long-running mode: one JSON request per stdin line, one JSON response per stdout line.
+# Requests may be pipelined; responses come back in order and echo the request "id".
+# With PREDICT_METRICS_PORT set, Prometheus metrics are served on that port.
+def serve(stdin=sys.stdin, stdout=sys.stdout):
+    metrics.start_server()
+    metrics.set_model_version(model.version)
+    model_watcher.install_signal()
+    model_watcher.start()
+    for line in iter(stdin.readline, ''):
+        line = line.strip()
+        if not line:
+            continue
+        with model_lock:
+            response = handle_request(line)
+        metrics.count_request("error" if "error" in response else "ok")
+        with metrics.stage('serialize'):
+            stdout.write(json.dumps(response, default=str) + '\n')
+        stdout.flush()
 
 # Entry point
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description="Predict a disease from symptoms.")
+    parser.add_argument('symptoms', nargs='?', help="comma separated symptoms or a JSON array")
+    parser.add_argument('--serve', action='store_true', help="answer JSON-lines requests on stdin")
+    parser.add_argument('--batch', metavar='INPUT', help="score a CSV or JSONL file of symptom records")
+    parser.add_argument('--output', metavar='OUTPUT', help="where --batch writes results (default: stdout)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="records per classifier call")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        sys.exit(0)
+
+    if args.batch:
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as out:
+                score_file(args.batch, out, args.batch_size)
+        else:
+            score_file(args.batch, sys.stdout, args.batch_size)
+        sys.exit(0)
+
+    if not args.symptoms:
         print(json.dumps({"error": "No symptoms provided"}))
         sys.exit(1)
 
     try:
-        symptom_input = sys.argv[1]
-        result = predict_disease(symptom_input)
+        result = predict_disease(args.symptoms)
         print(json.dumps(result))
     except Exception as e:
         print(json.dumps({"error": str(e)}))
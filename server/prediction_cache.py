@@ -0,0 +1,122 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+# Canonical, order-independent key for an already preprocessed symptom list
+def canonical_symptoms(symptoms):
+    return sorted({sym for sym in symptoms if sym})
+
+
+class PredictionCache:
+    """Two-tier cache for prediction results.
+
+    Tier one is an in-process LRU with a TTL. Tier two, enabled by db_path, is a
+    SQLite file that several worker processes can share. Entries are scoped by
+    the model version, so loading a different model never serves stale results.
+    Rows of other versions are left alone, since workers mid-deploy may still use
+    them, and every row is deleted once expired (checked every prune_interval seconds).
+    """
+
+    def __init__(self, version, max_entries=4096, ttl=3600, db_path=None, prune_interval=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.prune_interval = prune_interval
+        self.version = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._db = None
+        self._next_prune = 0.0
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "disk_misses": 0, "evictions": 0}
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "version TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (version, key))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_expiry ON predictions (expires_at)")
+        self.set_version(version)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    # Switch to a new model version. The in-process entries of the old one are dropped;
+    # reloading the same version keeps them
+    def set_version(self, version):
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._entries.clear()
+            self._prune(time.time())
+
+    # Delete expired rows from the shared tier, at most once per prune_interval
+    def _prune(self, now):
+        if self._db is None or now < self._next_prune:
+            return
+        self._next_prune = now + self.prune_interval
+        self._db.execute("DELETE FROM predictions WHERE expires_at <= ?", (now,))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+            self.stats["misses"] += 1
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM predictions WHERE version = ? AND key = ? AND expires_at > ?",
+                (self.version, key, now),
+            ).fetchone()
+            if row is None:
+                self.stats["disk_misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (version, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.version, key, json.dumps(value, default=str), expires_at),
+                )
+                self._prune(now)
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def report(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                size=len(self._entries),
+                hit_rate=round((self.stats["hits"] + self.stats["disk_hits"]) / lookups, 4) if lookups else 0.0,
+                version=self.version,
+                shared=self.db_path,
+            )
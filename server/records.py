@@ -0,0 +1,46 @@
+import csv
+import json
+
+# Record I/O shared by predict.py --batch and bulk_score.py; kept apart from
+# predict.py so readers and writers can run without loading the model.
+
+
+# Read (id, symptoms) records from a CSV with a "symptoms" column or from JSONL
+def read_records(path):
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if 'symptoms' not in (reader.fieldnames or []):
+                raise ValueError("CSV input needs a 'symptoms' column")
+            for row_number, row in enumerate(reader, start=1):
+                yield row.get('id') or row_number, row['symptoms'] or ''
+        return
+
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                yield record.get('id', line_number), record.get('symptoms') or []
+            else:
+                yield line_number, record
+
+# Write results as JSONL, or as CSV when the output path ends in .csv (or as_csv says so).
+# header=False leaves out the CSV header row, for appending to an existing file.
+def write_results(results, out, as_csv=None, header=True):
+    if as_csv is None:
+        as_csv = getattr(out, 'name', '').lower().endswith('.csv')
+    if as_csv:
+        writer = csv.writer(out)
+        if header:
+            writer.writerow(['id', 'disease', 'error'])
+        for record_id, result in results:
+            writer.writerow([record_id, result.get('disease', ''), result.get('error', '')])
+        return
+
+    for record_id, result in results:
+        row = {"id": record_id}
+        row.update(result)
+        out.write(json.dumps(row, default=str) + '\n')
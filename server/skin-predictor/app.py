@@ -1,16 +1,120 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import img_to_array
-from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge
 import numpy as np
-import io
+import os
+import time
+from typing import NamedTuple
+import metrics
+import profiling
+from inference import InferenceEngine, MicroBatcher, TFLiteEngine, configure_threads
+from model_watcher import ModelWatcher
+from preprocessing import InvalidImage, UploadTooLarge, decode_image, read_upload
+from result_cache import ResultCache, content_key, model_fingerprint
+from serving import BoundedExecutor, DeadlineExceeded, Overloaded
+
+# Keras .h5 by default; a .tflite file made by quantize.py is served with the TFLite interpreter
+MODEL_PATH = os.environ.get("SKIN_MODEL_PATH", "model/skindisease.h5")
+USE_TFLITE = MODEL_PATH.endswith(".tflite")
+if not USE_TFLITE:
+    from tensorflow.keras.models import load_model
+
+# Upload limits: bytes per upload and decoded pixels per image
+MAX_UPLOAD_BYTES = int(float(os.environ.get("SKIN_MAX_UPLOAD_MB", 10)) * 1024 * 1024)
+MAX_IMAGE_PIXELS = int(os.environ.get("SKIN_MAX_IMAGE_PIXELS", 50_000_000))
+
+# Admission control: decode + inference jobs running at once, how many more may wait,
+# and how long a request may take unless the client sends X-Request-Timeout-Ms
+MAX_CONCURRENCY = int(os.environ.get("SKIN_MAX_CONCURRENCY", 16))
+MAX_QUEUE = int(os.environ.get("SKIN_MAX_QUEUE", 32))
+REQUEST_TIMEOUT_MS = float(os.environ.get("SKIN_REQUEST_TIMEOUT_MS", 10_000))
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument(app)  # Request counts and latencies, plus GET /metrics
+
+# On-demand profiling: requests with X-Profile-Token: $SKIN_PROFILE_TOKEN, or a random
+# SKIN_PROFILE_SAMPLE_RATE share of them, get a cProfile + tracemalloc dump in SKIN_PROFILE_DIR
+profiling_enabled = profiling.install(
+    app,
+    token=os.environ.get("SKIN_PROFILE_TOKEN"),
+    sample_rate=float(os.environ.get("SKIN_PROFILE_SAMPLE_RATE", 0)),
+    directory=os.environ.get("SKIN_PROFILE_DIR", "profiles"),
+)
+
+# Reject oversized request bodies before werkzeug buffers them (multipart overhead allowed)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 64 * 1024
+
+# Requests beyond MAX_CONCURRENCY + MAX_QUEUE are turned away with 429 instead of piling up
+executor = BoundedExecutor(MAX_CONCURRENCY, MAX_QUEUE)
+
+# Repeat uploads: responses keyed by a hash of the raw bytes, and optionally
+# class probabilities keyed by a hash of the preprocessed 64x64 tensor.
+# Both are scoped to the model version and emptied when a new model is swapped in.
+upload_cache = ResultCache(int(os.environ.get("SKIN_CACHE_SIZE", 1024)))
+tensor_cache = ResultCache(int(os.environ.get("SKIN_TENSOR_CACHE_SIZE", 0)))
+
+
+class ActiveModel(NamedTuple):
+    version: str
+    model: object  # The Keras model, None for .tflite
+    engine: object
+    batcher: MicroBatcher
+
+
+# The model answering requests. load_engine() replaces it as a whole, so a request
+# that has picked it up finishes on that model even if a reload lands meanwhile.
+active = None
+
 
-# Load your trained Keras model
-model = load_model("model/skindisease.h5")  # Path to your model
+# Load your trained Keras model and its compiled forward pass; images from concurrent
+# requests are batched through it together. Then trace and warm the model before taking
+# traffic so the first request does not pay for it. Called again by model_watcher
+# (on its own thread) to swap in a new model file while the current one keeps serving.
+def load_engine():
+    global active
+    version = model_fingerprint(MODEL_PATH)
+    intra_op_threads = int(os.environ.get("SKIN_TF_INTRA_OP_THREADS", 0))
+    model = None
+    if USE_TFLITE:
+        engine = TFLiteEngine(MODEL_PATH, num_threads=intra_op_threads)
+    else:
+        if active is None:  # TF's thread pools can only be sized before the first op
+            configure_threads(intra_op_threads, os.environ.get("SKIN_TF_INTER_OP_THREADS", 0))
+        model = load_model(MODEL_PATH)  # Path to your model
+        engine = InferenceEngine(model)
+    batcher = MicroBatcher(
+        engine.predict,
+        max_batch_size=int(os.environ.get("SKIN_MAX_BATCH_SIZE", 16)),
+        max_wait_ms=float(os.environ.get("SKIN_MAX_BATCH_WAIT_MS", 5)),
+        on_batch=metrics.observe_batch,
+    )
+    engine.warm_up([1, batcher.max_batch_size])
+
+    previous, active = active, ActiveModel(version, model, engine, batcher)
+    upload_cache.set_version(version)
+    tensor_cache.set_version(version)
+    metrics.set_model_version(version)
+    if previous is not None:
+        previous.batcher.close()  # Runs what is already queued for the old model, then stops
+        print(f"[INFO] Model reloaded: {previous.version} -> {version}")
+    model_watcher.start()
+
+
+# Poll MODEL_PATH every SKIN_MODEL_RELOAD_INTERVAL seconds (0: never) and swap in a
+# changed file; under gunicorn a SIGHUP to a worker reloads it at once (see gunicorn.conf.py)
+model_watcher = ModelWatcher(
+    [MODEL_PATH], load_engine,
+    interval=float(os.environ.get("SKIN_MODEL_RELOAD_INTERVAL", 5)),
+    name="skin-model-watcher",
+    on_outcome=metrics.count_reload,
+)
+
+# Under gunicorn preload (SKIN_PRELOAD=1, see gunicorn.conf.py) the master only imports
+# this module and each worker calls load_engine() after fork: the TensorFlow runtime
+# hangs in a forked child once the parent has run an op.
+if os.environ.get("SKIN_LOAD_AFTER_FORK") != "1":
+    load_engine()
 
 # Labels your model predicts
 class_labels = ['Acne', 'Psoriasis', 'Eczema', 'Melanoma', 'Rosacea']
@@ -168,8 +272,121 @@ symptom_disease_mapping = {
 }
 
 
+# Normalize a symptom so "Sore_Throat", " sore throat" and "sore  throat" match
+def normalize_symptom(symptom):
+    return ' '.join(str(symptom).replace('_', ' ').lower().split())
+
+
+# Disease table keyed by lowercase name
+disease_by_name = {d["name"].lower(): d for d in disease_info}
+
+# Inverted index: normalized symptom -> diseases it points to
+disease_index = {}
+for symptom, disease_name in symptom_disease_mapping.items():
+    disease_index.setdefault(normalize_symptom(symptom), []).append(disease_name)
+
+
+# Score every disease against the symptom list in one pass, best match first
+def rank_diseases(symptoms):
+    given = list(dict.fromkeys(normalize_symptom(s) for s in symptoms if str(s).strip()))
+    matches, unknown = {}, []
+    for symptom in given:
+        diseases = disease_index.get(symptom)
+        if diseases is None:
+            unknown.append(symptom)
+            continue
+        for disease_name in diseases:
+            matches.setdefault(disease_name, []).append(symptom)
+
+    # Score is the share of the given symptoms a disease explains; ties keep first-match order
+    ranked = sorted(matches.items(), key=lambda item: -len(item[1]))
+    return [
+        {"disease_name": name, "score": round(len(matched) / len(given), 4), "matched_symptoms": matched}
+        for name, matched in ranked
+    ], unknown
+
+
+# Seconds since the front proxy received this request, from X-Request-Start: "t=<seconds>"
+# (nginx) or milliseconds / microseconds since the epoch (Heroku's router and others).
+# Without the header, time spent waiting for a gunicorn thread cannot be seen here.
+def queued_seconds():
+    value = request.headers.get("X-Request-Start", "").strip()
+    if value.startswith("t="):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return 0.0
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    waited = time.time() - started
+    return waited if 0 <= waited < 3600 else 0.0  # Ignore clock skew and garbage
+
+
+# Deadline for this request: the client's X-Request-Timeout-Ms, capped at the server default,
+# counted from when the request arrived rather than from when a thread picked it up
+def request_deadline():
+    timeout_ms = REQUEST_TIMEOUT_MS
+    try:
+        timeout_ms = min(timeout_ms, float(request.headers["X-Request-Timeout-Ms"]))
+    except (KeyError, ValueError):
+        pass
+    return time.monotonic() - queued_seconds() + max(0.0, timeout_ms) / 1000
+
+
+# Decode an upload and return the class probabilities; runs on the bounded executor
+def classify_upload(data, deadline, current):
+    if time.monotonic() >= deadline:
+        raise DeadlineExceeded("Request deadline passed before decoding")
+
+    timings = {}
+    image_array, _ = decode_image(data, MAX_IMAGE_PIXELS, timings=timings)
+    for stage, seconds in timings.items():
+        metrics.observe_stage(stage, seconds)
+
+    # Make prediction (queued and batched with other in-flight requests)
+    tensor_key = content_key(image_array.tobytes()) if tensor_cache.enabled else None
+    predictions = tensor_cache.get(tensor_key) if tensor_key else None
+    if tensor_key:
+        metrics.count_cache("tensor", predictions is not None)
+    if predictions is None:
+        with metrics.stage("inference"):
+            predictions = current.batcher.predict(image_array, deadline)
+        if tensor_key:
+            tensor_cache.put(tensor_key, predictions, version=current.version)
+    return predictions
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Upload is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}), 413
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    if active is None or not active.engine.ready:
+        return jsonify({"status": "warming up"}), 503
+    return jsonify({"status": "ready"})
+
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({"model_version": active.version if active else None, "upload": upload_cache.report(),
+                    "tensor": tensor_cache.report(), "rejected": executor.rejected, "expired": executor.expired,
+                    "reload": model_watcher.report()})
+
+
 @app.route('/predict-skin', methods=['POST'])
 def predict_skin():
+    deadline = request_deadline()
+    current = active  # This request is answered by this model, even if a reload swaps in another
     try:
         # Check for uploaded file
         if 'image' not in request.files:
@@ -179,40 +396,60 @@ def predict_skin():
         if file.filename == '':
             return jsonify({"error": "No selected image file"}), 400
 
-        # Load and preprocess image
-        image = Image.open(file.stream).convert("RGB")
-        print("[INFO] Original image size:", image.size)
-
-        image = image.resize((64, 64))  # Match model input shape
-        image_array = img_to_array(image) / 255.0
-        image_array = np.expand_dims(image_array, axis=0)
+        # Load and preprocess image (decoded at reduced size, resized to the 64x64 model input)
+        try:
+            with metrics.stage("read"):
+                data = read_upload(file.stream, MAX_UPLOAD_BYTES)
+        except UploadTooLarge as e:
+            return jsonify({"error": str(e)}), 413
 
-        print("[INFO] Preprocessed image shape:", image_array.shape)
+        # Same bytes as an earlier upload: answer from the cache
+        upload_key = content_key(data) if upload_cache.enabled else None
+        if upload_key:
+            cached = upload_cache.get(upload_key)
+            metrics.count_cache("upload", cached is not None)
+            if cached is not None:
+                return jsonify(cached)
 
-        # Make prediction
-        predictions = model.predict(image_array)
-        print("[INFO] Model raw predictions:", predictions)
+        try:
+            job = profiling.wrap_for_request(classify_upload) if profiling_enabled else classify_upload
+            predictions = executor.run(job, data, deadline, current, deadline=deadline)
+        except UploadTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+        except InvalidImage as e:
+            return jsonify({"error": str(e)}), 400
+        except Overloaded as e:
+            return jsonify({"error": str(e)}), 429, {"Retry-After": "1"}
+        except DeadlineExceeded as e:
+            return jsonify({"error": str(e)}), 504
 
         predicted_index = np.argmax(predictions)
         predicted_label = class_labels[predicted_index]
 
-        print("[INFO] Predicted label:", predicted_label)
-
         # Match prediction with known disease info
-        disease = next((d for d in disease_info if d["name"].lower() == predicted_label.lower()), None)
+        disease = disease_by_name.get(predicted_label.lower())
 
         if disease:
-            return jsonify({
+            result = {
                 "disease_name": disease["name"],
                 "disease_description": disease["description"],
                 "disease_treatment": disease["treatment"]
-            })
+            }
         else:
-            return jsonify({
+            result = {
                 "disease_name": predicted_label,
                 "disease_description": "No description available for this condition.",
                 "disease_treatment": "Consult a dermatologist for further guidance."
-            })
+            }
+
+        result["model_version"] = current.version
+        if upload_key:
+            upload_cache.put(upload_key, result, version=current.version)
+        with metrics.stage("serialize"):
+            return jsonify(result)
+
+    except RequestEntityTooLarge:
+        raise  # Answered by request_too_large
 
     except Exception as e:
         import traceback
@@ -223,19 +460,26 @@ def predict_skin():
 # Reintroducing the /predict-disease route
 @app.route("/predict-disease", methods=["POST"])
 def predict_disease():
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
     symptoms = data.get('symptoms', [])
 
-    # Convert list to lowercase strings
-    symptom_input = ', '.join(symptoms).lower()
+    # Accept a list or a comma separated string
+    if isinstance(symptoms, str):
+        symptoms = symptoms.split(',')
+    elif not isinstance(symptoms, list):
+        return jsonify({"error": "symptoms must be a list or a comma separated string"}), 400
 
-    # Match rule-based disease
-    predicted_disease = symptom_disease_mapping.get(symptom_input)
+    # Match rule-based diseases for all symptoms at once
+    ranked, unknown = rank_diseases(symptoms)
 
-    if not predicted_disease:
+    if not ranked:
         return jsonify({"error": "Symptoms not recognized. Please consult a doctor."}), 400
 
-    disease = next((d for d in disease_info if d["name"] == predicted_disease), None)
+    disease = disease_by_name.get(ranked[0]["disease_name"].lower())
 
     if not disease:
         return jsonify({"error": "No matching disease found for predicted class."}), 400
@@ -243,8 +487,11 @@ def predict_disease():
     return jsonify({
         "disease_name": disease["name"],
         "disease_description": disease["description"],
-        "disease_treatment": disease["treatment"]
+        "disease_treatment": disease["treatment"],
+        "ranked_diseases": ranked,
+        "unrecognized_symptoms": unknown
     })
 
 if __name__ == "__main__":
+    model_watcher.install_signal()
     app.run(debug=True)
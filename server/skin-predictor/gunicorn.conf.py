@@ -0,0 +1,58 @@
+import gc
+import os
+
+# Production settings for the skin predictor: gunicorn -c gunicorn.conf.py app:app
+# HTTP threads only read uploads and wait; decode + inference run on the app's
+# bounded executor (SKIN_MAX_CONCURRENCY / SKIN_MAX_QUEUE), which answers 429 when full.
+# There must be more HTTP threads than executor slots, or the executor never fills and
+# the overflow waits unseen in gthread's own queue instead of getting 429. The headroom
+# also keeps /healthz, /readyz and /metrics answering while every slot is taken.
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+worker_class = "gthread"
+executor_slots = int(os.environ.get("SKIN_MAX_CONCURRENCY", 16)) + int(os.environ.get("SKIN_MAX_QUEUE", 32))
+threads = int(os.environ.get("SKIN_HTTP_THREADS", executor_slots + 8))
+if threads <= executor_slots:
+    raise ValueError(f"SKIN_HTTP_THREADS ({threads}) must exceed SKIN_MAX_CONCURRENCY + SKIN_MAX_QUEUE ({executor_slots})")
+# Connections beyond this stay in the listen backlog rather than in gthread's unbounded queue
+worker_connections = int(os.environ.get("SKIN_WORKER_CONNECTIONS", threads * 2))
+timeout = int(os.environ.get("SKIN_TIMEOUT", 60))
+graceful_timeout = 30
+
+# SKIN_PRELOAD=1: one worker per core by default, with TensorFlow, Flask, Pillow and the app
+# tables imported once in the master and shared copy-on-write. The model itself is loaded in
+# each worker after fork (see app.load_engine), with TF pinned to cores / workers threads.
+preload_app = os.environ.get("SKIN_PRELOAD") == "1"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() if preload_app else 1))
+
+if preload_app:
+    os.environ["SKIN_LOAD_AFTER_FORK"] = "1"
+    os.environ.setdefault("SKIN_TF_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    os.environ.setdefault("SKIN_TF_INTER_OP_THREADS", "1")
+
+
+# Move everything the master imported into the permanent generation, so the
+# workers' garbage collector does not write to (and un-share) those pages
+def when_ready(server):
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import app
+        app.load_engine()
+
+
+# Workers reset their signal handlers on start; afterwards `kill -HUP <worker pid>` reloads
+# the model in that worker without restarting it (SIGHUP to the master restarts all workers)
+def post_worker_init(worker):
+    import app
+    app.model_watcher.install_signal()
+
+
+# With PROMETHEUS_MULTIPROC_DIR set (an empty directory, cleared before start), /metrics
+# sums every worker; drop the files of workers that exit
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
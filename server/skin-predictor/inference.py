@@ -0,0 +1,216 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+import numpy as np
+
+from serving import DeadlineExceeded
+
+# TensorFlow is imported where it is used, so a .tflite deployment with ai_edge_litert
+# installed never loads it
+
+_CLOSE = object()  # Queued by MicroBatcher.close()
+
+
+# Size TensorFlow's thread pools (0 keeps TF's default of one thread per core). Must run
+# before the first TF op; with several workers per node, intra_op * workers should not exceed the cores.
+def configure_threads(intra_op=0, inter_op=0):
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(int(intra_op))
+    tf.config.threading.set_inter_op_parallelism_threads(int(inter_op))
+
+
+class MicroBatcher:
+    """Collects images from concurrent requests and runs them through the model together.
+
+    A background thread takes the first queued image, waits up to max_wait_ms for
+    more (or until max_batch_size is reached), runs predict_fn once on the stacked
+    batch and hands each row of the output back to the request that queued it.
+    Images whose deadline has passed by the time their batch is formed are
+    dropped without running the model. After close() the thread finishes the
+    images already queued and exits; a late submit() runs on a thread that
+    exits again as soon as the queue is empty.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, on_batch=None):
+        self.predict_fn = predict_fn
+        self.on_batch = on_batch  # Called with (batch size, seconds in predict_fn) after each batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self._closed = False
+
+    # Start the worker thread on first use, after close(), and again in a forked child
+    # (threads do not survive fork). Called with self._lock held.
+    def _ensure_worker(self):
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        if self._pid != os.getpid():
+            self._queue = queue.Queue()
+        self._pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name="skin-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, image, deadline=None):
+        future = Future()
+        with self._lock:
+            self._ensure_worker()
+            self._queue.put((image, future, deadline))
+        return future
+
+    # Let the worker thread exit once everything queued so far has run
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._worker is not None and self._pid == os.getpid():
+                self._queue.put(_CLOSE)
+
+    # Predict a single preprocessed image (H, W, C) and return its class probabilities
+    def predict(self, image, deadline=None):
+        future = self.submit(image, deadline)
+        if deadline is None:
+            return future.result()
+        try:
+            return future.result(max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("Request deadline passed during inference") from None
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        flush_at = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        closing = self._closed  # Restarted by a late submit() after close(): exit once idle again
+        while True:
+            items = self._collect()
+            if _CLOSE in items:
+                closing = True
+                items = [item for item in items if item is not _CLOSE]
+            self._run_batch(items)
+            # submit() queues under the lock, so nothing can be left behind once this sees an empty queue
+            if closing:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+
+    def _run_batch(self, items):
+        # Requests that were cancelled or ran out of time while queued are dropped here
+        now = time.monotonic()
+        batch = []
+        for image, future, deadline in items:
+            if not future.set_running_or_notify_cancel():
+                continue
+            if deadline is not None and deadline <= now:
+                future.set_exception(DeadlineExceeded("Request deadline passed before inference"))
+                continue
+            batch.append((image, future))
+        if not batch:
+            return
+        futures = [future for _, future in batch]
+
+        try:
+            start = time.perf_counter()
+            outputs = np.asarray(self.predict_fn(np.stack([image for image, _ in batch])))
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(futures)
+        if self.on_batch is not None:
+            self.on_batch(len(futures), elapsed)
+        for future, output in zip(futures, outputs):
+            future.set_result(output)
+
+
+class InferenceEngine:
+    """Runs the Keras model through a single traced tf.function.
+
+    The input signature is fixed to (N, 64, 64, 3) float32 with a free batch
+    dimension, so the graph is traced once and every later call skips the
+    per-call setup that model.predict does. warm_up() pushes a few batches
+    through before the service reports ready.
+    """
+
+    def __init__(self, model, input_shape=(64, 64, 3)):
+        import tensorflow as tf
+
+        self.model = model
+        self.input_shape = tuple(input_shape)
+        self.ready = False
+        self._convert = tf.convert_to_tensor
+        self._forward = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[tf.TensorSpec((None,) + self.input_shape, tf.float32)],
+        )
+
+    def predict(self, batch):
+        return self._forward(self._convert(batch, dtype="float32")).numpy()
+
+    def warm_up(self, batch_sizes=(1,)):
+        for size in sorted(set(batch_sizes)):
+            self.predict(np.zeros((size,) + self.input_shape, dtype=np.float32))
+        self.ready = True
+
+
+def tflite_interpreter(path, num_threads=None):
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path, num_threads=num_threads or None)
+
+
+class TFLiteEngine:
+    """Runs a converted .tflite model (see quantize.py) with the InferenceEngine interface.
+
+    The interpreter keeps its batch-1 input shape and invokes once per image: resizing
+    it to every micro-batch size would reallocate its tensors each time, and
+    batch-1 is what the TFLite kernels are tuned for. Only the micro-batcher
+    thread (and warm-up before it starts) calls predict, but a lock keeps the
+    interpreter single-threaded regardless.
+    """
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.ready = False
+        self._interpreter = tflite_interpreter(path, num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(d) for d in self._input["shape"][1:])
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        outputs = np.empty((len(batch), self._output["shape"][-1]), dtype=np.float32)
+        with self._lock:
+            for i, image in enumerate(batch):
+                self._interpreter.set_tensor(self._input["index"], image[None])
+                self._interpreter.invoke()
+                outputs[i] = self._interpreter.get_tensor(self._output["index"])[0]
+        return outputs
+
+    def warm_up(self, batch_sizes=(1,)):
+        self.predict(np.zeros((max(batch_sizes),) + self.input_shape, dtype=np.float32))
+        self.ready = True
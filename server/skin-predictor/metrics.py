@@ -0,0 +1,34 @@
+from prometheus_client import Counter, Histogram
+
+from flask_metrics import ServiceMetrics
+
+# Stage and request latencies: sub-millisecond cache hits up to multi-second decodes under load
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+service = ServiceMetrics("skin", "Time spent in each /predict-skin stage", LATENCY_BUCKETS, LATENCY_BUCKETS)
+CACHE_LOOKUPS = Counter(
+    "skin_cache_lookups_total", "Result cache lookups", ["cache", "result"])
+BATCH_SIZE = Histogram(
+    "skin_batch_size", "Images per model call", buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_SECONDS = Histogram(
+    "skin_batch_inference_seconds", "Model time per batch", buckets=LATENCY_BUCKETS)
+
+stage = service.stage
+set_model_version = service.set_model_version
+count_reload = service.count_reload
+instrument = service.instrument
+
+
+# Stages timed by the code itself, such as the timings decode_image returns
+def observe_stage(name, seconds):
+    service.stage_seconds.labels(name).observe(seconds)
+
+
+def count_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# MicroBatcher on_batch callback
+def observe_batch(size, seconds):
+    BATCH_SIZE.observe(size)
+    BATCH_SECONDS.observe(seconds)
@@ -0,0 +1,65 @@
+import io
+import time
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+# Model input size (width, height)
+TARGET_SIZE = (64, 64)
+
+
+class UploadTooLarge(ValueError):
+    """Upload is over the byte or pixel limit (HTTP 413)."""
+
+
+class InvalidImage(ValueError):
+    """Upload is not an image Pillow can decode (HTTP 400)."""
+
+
+# Read at most max_bytes of the upload; anything longer is rejected instead of buffered
+def read_upload(stream, max_bytes):
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise UploadTooLarge(f"Image is larger than {max_bytes // (1024 * 1024)} MB")
+    return data
+
+
+def decode_image(data, max_pixels, size=TARGET_SIZE, timings=None):
+    """Decode an upload into a (64, 64, 3) float32 array scaled to [0, 1].
+
+    Image.open only parses the header, so the pixel limit is checked before any
+    decoding. For JPEG, draft() makes libjpeg scale by 1/2-1/8 while decoding,
+    so a 12 MP photo is decoded at roughly 500x375 instead of full size.
+    Returns the array and the original (width, height). If timings is a dict,
+    the seconds spent decoding and resizing are stored under "decode" and "resize".
+    """
+    start = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        # Raised by open() itself once the header claims twice Pillow's own pixel limit
+        raise UploadTooLarge(f"Image has more than {max_pixels} pixels") from e
+    except UnidentifiedImageError as e:
+        raise InvalidImage("Uploaded file is not a supported image") from e
+
+    original_size = image.size
+    if image.width * image.height > max_pixels:
+        raise UploadTooLarge(f"Image has more than {max_pixels} pixels")
+
+    try:
+        image.draft("RGB", size)
+        image = image.convert("RGB")
+        decoded = time.perf_counter()
+        image = image.resize(size, reducing_gap=3.0)
+    except Image.DecompressionBombError as e:
+        raise UploadTooLarge(f"Image has more than {max_pixels} pixels") from e
+    except OSError as e:
+        raise InvalidImage("Uploaded image could not be decoded") from e
+
+    # One uint8 -> float32 conversion, then scale in place
+    array = np.asarray(image, dtype=np.float32)
+    array /= 255.0
+    if timings is not None:
+        timings["decode"] = decoded - start
+        timings["resize"] = time.perf_counter() - decoded
+    return array, original_size
@@ -0,0 +1,166 @@
+# Generated from shared/profiling.py by shared/sync.py; edit that file and re-run the script.
+
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import pstats
+import random
+import cProfile
+import threading
+import tracemalloc
+
+from flask import g, request
+
+# From Python 3.12 cProfile sits on sys.monitoring: one profiler for the whole process,
+# which sees every thread and refuses to start while another one is enabled
+PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+
+class RequestProfiler:
+    """cProfile call graph plus a tracemalloc snapshot for one request.
+
+    Only one request per process is profiled at a time: start() returns None
+    while another profile is running (or another tool such as a debugger holds
+    the profiler), and the request simply runs unprofiled. Before Python 3.12
+    cProfile only sees the thread that enabled it, so work handed to another
+    thread is profiled through wrap(); from 3.12 the one profiler already sees
+    that thread, along with any other requests running at the same time. The
+    tracemalloc snapshot is always process-wide.
+    """
+
+    _busy = threading.Lock()
+
+    def __init__(self, request_id, frames):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start(frames)
+        self._profile = self._start()
+
+    @classmethod
+    def start(cls, request_id, frames=10):
+        if not cls._busy.acquire(blocking=False):
+            return None
+        try:
+            return cls(request_id, frames)
+        except ValueError:  # "Another profiling tool is already active"
+            cls._release_tracing(tracemalloc.is_tracing())
+            cls._busy.release()
+            return None
+        except BaseException:
+            cls._busy.release()
+            raise
+
+    @staticmethod
+    def _release_tracing(owned):
+        if owned and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _start(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    # Profile fn(*args) in whichever thread ends up calling it
+    def wrap(self, fn):
+        if PROCESS_WIDE_PROFILER:
+            return fn
+
+        def profiled(*args, **kwargs):
+            profile = self._start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return profiled
+
+    # Stop profiling and write <id>.prof (pstats), <id>.tracemalloc (snapshot) and <id>.txt (summary)
+    def finish(self, directory, status):
+        try:
+            self._profile.disable()
+            elapsed = time.perf_counter() - self.started
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, cProfile.__file__),
+            ])
+        finally:
+            self._release_tracing(self._owns_tracing)
+            RequestProfiler._busy.release()
+
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.request_id)
+        with self._lock:
+            stats = pstats.Stats(*self._profiles)
+        stats.dump_stats(base + ".prof")
+        snapshot.dump(base + ".tracemalloc")
+
+        with open(base + ".txt", "w") as out:
+            out.write(f"{request.method} {request.path} -> {status} in {elapsed * 1000:.1f} ms\n\n")
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(40)
+            out.write("Top allocations by line:\n")
+            for stat in snapshot.statistics("lineno")[:25]:
+                out.write(f"{stat}\n")
+
+
+# Request IDs become file names, so keep them short and path-safe
+def profile_id():
+    given = re.sub(r"[^A-Za-z0-9_.-]", "", request.headers.get("X-Request-Id", ""))[:64].lstrip(".")
+    return f"{given}-{uuid.uuid4().hex[:8]}" if given else uuid.uuid4().hex
+
+
+def install(app, token=None, sample_rate=0.0, directory="profiles"):
+    """Profile requests that send X-Profile-Token: <token>, and a sample_rate share of the rest.
+
+    With no token and a zero sample rate nothing is registered, so requests run
+    exactly as before. Profiled responses carry an X-Profile-Id header naming the
+    files written to directory; a request that asked for a profile while another
+    was being taken gets X-Profile-Skipped: busy instead.
+    """
+    if not token and sample_rate <= 0:
+        return False
+
+    def asked():
+        given = request.headers.get("X-Profile-Token")
+        return bool(token and given and hmac.compare_digest(given.encode(), token.encode()))
+
+    @app.before_request
+    def start_profile():
+        g.profile_asked = asked()
+        if g.profile_asked or (sample_rate > 0 and random.random() < sample_rate):
+            profiler = RequestProfiler.start(profile_id())
+            if profiler is not None:
+                g.profiler = profiler
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.finish(directory, response.status_code)
+            response.headers["X-Profile-Id"] = profiler.request_id
+        elif g.get("profile_asked"):
+            response.headers["X-Profile-Skipped"] = "busy"
+        return response
+
+    # after_request is skipped when the view raises; still stop tracing and keep the profile
+    @app.teardown_request
+    def abandon_profile(exc):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.finish(directory, 500)
+
+    return True
+
+
+# Wrap fn for another thread when the current request is being profiled
+def wrap_for_request(fn):
+    profiler = g.get("profiler")
+    return profiler.wrap(fn) if profiler is not None else fn
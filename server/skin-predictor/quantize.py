@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import contextlib
+
+import numpy as np
+
+from benchmarking import script_peak_rss_mb
+from preprocessing import decode_image
+
+# Convert model/skindisease.h5 into a smaller TFLite model and compare the two.
+#
+#   python quantize.py --mode float16 --eval-dir heldout/
+#   python quantize.py --mode int8 --calibration-dir train_sample/ --eval-dir heldout/
+#
+# float16 halves the weights; dynamic stores int8 weights and computes in float;
+# int8 also quantizes activations, calibrated on --calibration-dir images, and keeps
+# float32 input and output so app.py feeds it the same arrays. Calibration images must
+# not be held-out images, or the parity and accuracy figures come out optimistic; the
+# report records where they came from. Serve the result with
+# SKIN_MODEL_PATH=model/skindisease_<mode>.tflite.
+#
+# The held-out set is a directory with one sub-directory of images per class, named
+# like the labels below (same order as class_labels in app.py).
+CLASS_LABELS = ['Acne', 'Psoriasis', 'Eczema', 'Melanoma', 'Rosacea']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+MAX_PIXELS = 50_000_000
+
+
+def image_paths(directory):
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+# Content hashes, so a copy of a held-out image under another name still counts as shared
+def image_digests(paths):
+    digests = set()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digests.add(hashlib.sha256(f.read()).hexdigest())
+    return digests
+
+
+def load_images(paths):
+    arrays = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            arrays.append(decode_image(f.read(), MAX_PIXELS)[0])
+    return np.stack(arrays) if arrays else np.zeros((0, 64, 64, 3), dtype=np.float32)
+
+
+# Images and label indices from <dir>/<label>/*.jpg; unknown folder names get label -1
+def load_labeled(directory):
+    by_name = {label.lower(): i for i, label in enumerate(CLASS_LABELS)}
+    paths, labels = [], []
+    for path in image_paths(directory):
+        paths.append(path)
+        labels.append(by_name.get(os.path.basename(os.path.dirname(path)).lower(), -1))
+    return load_images(paths), np.array(labels)
+
+
+def convert(model, mode, calibration):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == 'int8':
+        converter.representative_dataset = lambda: ([image[None]] for image in calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+
+def time_per_image(predict, images, repeat):
+    predict(images[:1])
+    samples = []
+    for i in range(repeat):
+        image = images[i % len(images)][None]
+        start = time.perf_counter()
+        predict(image)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {"p50_ms": round(samples[len(samples) // 2] * 1000, 3), "p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 3)}
+
+
+# Peak RSS (MB) of a fresh interpreter that loads one engine and runs one prediction
+def engine_rss(model_path):
+    if model_path.endswith('.tflite'):
+        load = f"from inference import TFLiteEngine; e = TFLiteEngine({model_path!r})"
+    else:
+        load = (f"from tensorflow.keras.models import load_model; from inference import InferenceEngine; "
+                f"e = InferenceEngine(load_model({model_path!r}))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    return script_peak_rss_mb(f"import sys, numpy as np; sys.path.insert(0, {here!r}); {load}; "
+                              f"e.predict(np.zeros((1,) + e.input_shape, dtype=np.float32))")
+
+
+def report(keras_path, tflite_path, images, labels, repeat):
+    from tensorflow.keras.models import load_model
+    from inference import InferenceEngine, TFLiteEngine
+
+    keras_engine = InferenceEngine(load_model(keras_path))
+    tflite_engine = TFLiteEngine(tflite_path)
+    expected = keras_engine.predict(images)
+    actual = tflite_engine.predict(images)
+
+    parity = {
+        "images": len(images),
+        "top1_agreement": round(float((expected.argmax(1) == actual.argmax(1)).mean()), 4),
+        "max_abs_diff": round(float(np.abs(expected - actual).max()), 6),
+        "mean_abs_diff": round(float(np.abs(expected - actual).mean()), 6),
+    }
+    known = labels >= 0
+    if known.any():
+        parity["labeled_images"] = int(known.sum())
+        parity["keras_accuracy"] = round(float((expected.argmax(1)[known] == labels[known]).mean()), 4)
+        parity["tflite_accuracy"] = round(float((actual.argmax(1)[known] == labels[known]).mean()), 4)
+
+    return {
+        "parity": parity,
+        "size_bytes": {"keras": os.path.getsize(keras_path), "tflite": os.path.getsize(tflite_path)},
+        "latency_batch1": {"keras": time_per_image(keras_engine.predict, images, repeat),
+                           "tflite": time_per_image(tflite_engine.predict, images, repeat)},
+        "peak_rss_mb": {"keras": engine_rss(keras_path), "tflite": engine_rss(tflite_path)},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Quantize the skin model to TFLite and compare it with the Keras model.")
+    parser.add_argument('--model', default='model/skindisease.h5')
+    parser.add_argument('--mode', choices=['float16', 'dynamic', 'int8'], default='float16')
+    parser.add_argument('--output', help="default: model/skindisease_<mode>.tflite")
+    parser.add_argument('--calibration-dir', help="images for int8 calibration, required for int8; "
+                        "must not share images with --eval-dir")
+    parser.add_argument('--calibration-size', type=int, default=200)
+    parser.add_argument('--eval-dir', help="held-out images, one sub-directory per class")
+    parser.add_argument('--repeat', type=int, default=200, help="timed single-image predictions per engine")
+    parser.add_argument('--max-top1-drop', type=float, default=0.01,
+                        help="exit non-zero if top-1 agreement is below 1 - this")
+    args = parser.parse_args()
+    output = args.output or os.path.join(os.path.dirname(args.model), f"skindisease_{args.mode}.tflite")
+
+    eval_dir = args.eval_dir
+    images, labels = load_labeled(eval_dir) if eval_dir else (None, None)
+    if images is None or not len(images):
+        eval_dir = None
+        # Without a held-out set the report only shows agreement on random inputs
+        print("No --eval-dir images; comparing on random inputs, accuracy is not reported", file=sys.stderr)
+        images = np.random.default_rng(0).random((64, 64, 64, 3), dtype=np.float32)
+        labels = np.full(len(images), -1)
+
+    calibration, calibration_report = None, None
+    if args.mode == 'int8':
+        if not args.calibration_dir:
+            parser.error("--mode int8 needs --calibration-dir, separate from the --eval-dir images")
+        calibration_paths = list(image_paths(args.calibration_dir))[:args.calibration_size]
+        if eval_dir and image_digests(calibration_paths) & image_digests(image_paths(eval_dir)):
+            parser.error("--calibration-dir shares images with --eval-dir; calibrate on images the report does not use")
+        calibration = load_images(calibration_paths)
+        if not len(calibration):
+            parser.error(f"No images found in --calibration-dir {args.calibration_dir}")
+        calibration_report = {"dir": args.calibration_dir, "images": len(calibration)}
+
+    from tensorflow.keras.models import load_model
+    # The converter prints the exported signature to stdout; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        converted = convert(load_model(args.model), args.mode, calibration)
+    with open(output, 'wb') as f:
+        f.write(converted)
+    print(f"Wrote {output}", file=sys.stderr)
+
+    result = report(args.model, output, images, labels, args.repeat)
+    result["mode"] = args.mode
+    result["eval_dir"] = eval_dir  # None: compared on random inputs
+    result["calibration"] = calibration_report
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["parity"]["top1_agreement"] >= 1 - args.max_top1_drop else 1)
@@ -0,0 +1,70 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Fast content hash for upload bytes or a preprocessed tensor
+def content_key(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Identifies the model file a cache was filled from
+def model_fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class ResultCache:
+    """Thread-safe bounded LRU; cleared whenever the model version changes."""
+
+    def __init__(self, max_entries, version=None):
+        self.max_entries = max(0, int(max_entries))
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # version: the model that produced value; results from a model that has since been replaced are dropped
+    def put(self, key, value, version=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def report(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
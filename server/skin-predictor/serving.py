@@ -0,0 +1,53 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class Overloaded(RuntimeError):
+    """Every worker is busy and the wait queue is full (HTTP 429)."""
+
+
+class DeadlineExceeded(RuntimeError):
+    """The client stopped waiting before the work finished (HTTP 504)."""
+
+
+class BoundedExecutor:
+    """Thread pool for decode + inference with admission control.
+
+    At most max_workers jobs run and max_pending more may wait. Anything beyond
+    that is refused straight away with Overloaded instead of queueing, so
+    latency stays bounded under a spike and the client can retry elsewhere.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(0, int(max_pending))
+        self.rejected = 0
+        self.expired = 0
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="skin-inference")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise Overloaded("Too many requests in flight, please retry shortly")
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    # Run fn(*args) on the pool and wait for it until deadline (a time.monotonic() value)
+    def run(self, fn, *args, deadline):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            future.cancel()  # Dropped if it has not started; running jobs check the deadline themselves
+            self.expired += 1
+            raise DeadlineExceeded("Prediction did not finish before the request deadline") from None
+        except DeadlineExceeded:
+            self.expired += 1  # The job noticed the deadline itself
+            raise
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# app.py and its helpers import each other by bare name from the service directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
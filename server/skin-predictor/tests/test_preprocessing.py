@@ -0,0 +1,45 @@
+import io
+import zlib
+import struct
+
+import pytest
+from PIL import Image
+
+from preprocessing import InvalidImage, UploadTooLarge, decode_image
+
+MAX_PIXELS = 50_000_000
+
+
+def png_chunk(kind, body):
+    return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+
+# A tiny PNG whose header claims width x height pixels; the pixel data is never reached
+def png_header(width, height):
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', ihdr) + png_chunk(b'IDAT', zlib.compress(b'')) \
+        + png_chunk(b'IEND', b'')
+
+
+def jpeg(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 90)).save(out, 'JPEG')
+    return out.getvalue()
+
+
+def test_decodes_to_model_input():
+    array, size = decode_image(jpeg(320, 240), MAX_PIXELS)
+    assert array.shape == (64, 64, 3) and array.dtype == 'float32' and size == (320, 240)
+    assert 0.0 <= array.min() and array.max() <= 1.0
+
+
+# 10000x6000 is over our limit; 20000x20000 is over Pillow's too, which raises inside open()
+@pytest.mark.parametrize('width, height', [(10_000, 6_000), (20_000, 20_000)])
+def test_header_over_the_pixel_limit_is_too_large(width, height):
+    with pytest.raises(UploadTooLarge):
+        decode_image(png_header(width, height), MAX_PIXELS)
+
+
+def test_not_an_image_is_invalid():
+    with pytest.raises(InvalidImage):
+        decode_image(b'definitely not an image', MAX_PIXELS)
@@ -0,0 +1,100 @@
+import csv
+import numpy as np
+
+
+# Normalize a symptom name so "Skin_Rash", "skin rash" and "spotting_ urination" line up
+def normalize_symptom(name):
+    return ' '.join(str(name).replace('_', ' ').lower().split())
+
+
+class SymptomIndex:
+    """Cosine-similarity index over the one-hot symptom rows of Training.csv.
+
+    Duplicate rows are dropped and the rest are L2-normalized once, grouped by
+    disease. A query is one matrix-vector product followed by a per-disease max,
+    so the ranked differential costs a few microseconds for the 132 symptoms.
+    """
+
+    def __init__(self, symptoms, diseases, matrix, group_starts):
+        self.symptoms = symptoms          # column order of the matrix
+        self.diseases = diseases          # one label per group, in group order
+        self.matrix = matrix              # (unique rows, symptoms) float32, rows L2-normalized
+        self.group_starts = group_starts  # first row of each disease group
+        self.symptom_to_column = {normalize_symptom(s): i for i, s in enumerate(symptoms)}
+
+    @classmethod
+    def from_csv(cls, path, label_column='prognosis'):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            label_at = header.index(label_column)
+            columns = [i for i, name in enumerate(header) if i != label_at and name.strip()]
+            rows = set()
+            for row in reader:
+                if len(row) <= label_at or not row[label_at].strip():
+                    continue
+                bits = tuple(1 if row[i].strip() not in ('', '0') else 0 for i in columns)
+                rows.add((row[label_at].strip(), bits))
+
+        return cls.from_rows([header[i].strip() for i in columns], sorted(rows))
+
+    @classmethod
+    def from_rows(cls, symptoms, labelled_rows):
+        # Rows must already be sorted by label so each disease is one contiguous block
+        labels = [label for label, _ in labelled_rows]
+        matrix = np.array([bits for _, bits in labelled_rows], dtype=np.float32).reshape(len(labels), len(symptoms))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        diseases, group_starts = [], []
+        for i, label in enumerate(labels):
+            if not diseases or diseases[-1] != label:
+                diseases.append(label)
+                group_starts.append(i)
+
+        return cls(symptoms, diseases, matrix, np.array(group_starts, dtype=np.intp))
+
+    # Split symptoms into matched column indices and the names we do not know
+    def lookup(self, symptoms):
+        columns, unknown = [], []
+        for symptom in symptoms:
+            column = self.symptom_to_column.get(normalize_symptom(symptom))
+            if column is None:
+                unknown.append(symptom)
+            elif column not in columns:
+                columns.append(column)
+        return columns, unknown
+
+    # Build the (n_queries, n_symptoms) normalized query matrix
+    def encode(self, symptom_lists):
+        Q = np.zeros((len(symptom_lists), len(self.symptoms)), dtype=np.float32)
+        for row, symptoms in enumerate(symptom_lists):
+            columns, _ = self.lookup(symptoms)
+            if columns:
+                Q[row, columns] = 1.0 / np.sqrt(len(columns))
+        return Q
+
+    # Best row score per disease, shape (n_queries, n_diseases)
+    def disease_scores(self, Q):
+        return np.maximum.reduceat(Q @ self.matrix.T, self.group_starts, axis=1)
+
+    def query(self, symptoms, k=5):
+        return self.query_batch([symptoms], k)[0]
+
+    # Top-k diseases with cosine scores for each list of symptoms
+    def query_batch(self, symptom_lists, k=5):
+        if not symptom_lists:
+            return []
+
+        scores = self.disease_scores(self.encode(symptom_lists))
+        k = min(k, len(self.diseases))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ranked = sorted(candidates, key=lambda i: (-scores[row, i], self.diseases[i]))
+            results.append([
+                {"disease": self.diseases[i], "score": round(float(scores[row, i]), 4)}
+                for i in ranked if scores[row, i] > 0
+            ])
+        return results
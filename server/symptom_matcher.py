@@ -0,0 +1,204 @@
+import re
+import csv
+from collections import Counter
+from functools import lru_cache
+
+from model_bundle import TOKEN_PATTERN
+from symptom_index import normalize_symptom
+
+# Everyday wording -> Training.csv symptom, checked before the vocabulary so the
+# differential sees the dataset's name. Spelling mistakes are left to the fuzzy index.
+# Plain "fever" is not mapped: the dataset distinguishes mild and high fever.
+SYNONYMS = {
+    "stomach ache": "stomach pain",
+    "stomachache": "stomach pain",
+    "tummy ache": "belly pain",
+    "tummy pain": "belly pain",
+    "diarrhea": "diarrhoea",
+    "loose motion": "diarrhoea",
+    "loose motions": "diarrhoea",
+    "throwing up": "vomiting",
+    "puking": "vomiting",
+    "tired": "fatigue",
+    "tiredness": "fatigue",
+    "exhaustion": "fatigue",
+    "high temperature": "high fever",
+    "short of breath": "breathlessness",
+    "shortness of breath": "breathlessness",
+    "itchy": "itching",
+    "itchiness": "itching",
+    "rash": "skin rash",
+    "sneezing": "continuous sneezing",
+    "stuffy nose": "congestion",
+    "blocked nose": "congestion",
+    "sore throat": "throat irritation",
+    "heartburn": "acidity",
+    "chills and shivering": "chills",
+    "feeling sick": "nausea",
+    "queasy": "nausea",
+    "dizzy": "dizziness",
+    "giddiness": "dizziness",
+    "yellow skin": "yellowish skin",
+    "yellow eyes": "yellowing of eyes",
+    "lost weight": "weight loss",
+    "no appetite": "loss of appetite",
+    "joint ache": "joint pain",
+    "body ache": "muscle pain",
+    "body pain": "muscle pain",
+    "palpitation": "palpitations",
+    "racing heart": "fast heart rate",
+    "anxious": "anxiety",
+}
+
+# Words ignored when comparing word sets, so "pain in chest" finds "chest pain"
+FILLER_WORDS = {"in", "on", "of", "the", "my", "a", "an", "and", "at", "around", "behind"}
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Levenshtein distance, stopping early once it is certain to exceed limit
+def edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class SymptomMatcher:
+    """Maps free-text symptoms onto the names the model and symptom index know.
+
+    Targets are the Training.csv symptom names and the words of the model's own
+    vocabulary (the terms its vectorizer keeps, not the whole tfidf header),
+    indexed once by character trigram. A lookup gathers the targets sharing the
+    most trigrams with the input and confirms the best one by edit distance, so
+    "headake" becomes "headache" with confidence 1 - distance / length.
+
+    The matcher never takes away words the model already reads: inputs made only
+    of vocabulary words pass through untouched, before any synonym ("dizzy" stays
+    "dizzy"), and vocabulary words a mapping would drop ("ache" in "stomach ache")
+    are kept next to the symptom in "kept_words" and still sent to the model.
+
+    Every report says in "in_model" whether any word of the matched symptom or the
+    kept words is in the model vocabulary; symptom names the model does not know
+    still feed the differential, but do not change the predicted disease.
+    """
+
+    def __init__(self, symptoms, vocabulary, synonyms=SYNONYMS, min_confidence=0.75, candidates=8):
+        self.symptoms = {normalize_symptom(s) for s in symptoms if normalize_symptom(s)}
+        self.vocabulary = {w.lower() for w in vocabulary if w}
+        self._token_re = re.compile(TOKEN_PATTERN)
+        self._by_words = {}
+        for symptom in sorted(self.symptoms):
+            self._by_words.setdefault(frozenset(symptom.split()) - FILLER_WORDS, symptom)
+        self.synonyms = {normalize_symptom(k): normalize_symptom(v) for k, v in synonyms.items()}
+        self.min_confidence = min_confidence
+        self.candidates = candidates
+
+        self.targets = sorted(self.symptoms | self.vocabulary)
+        self._grams = [trigrams(t) for t in self.targets]
+        self._index = {}
+        for position, grams in enumerate(self._grams):
+            for gram in grams:
+                self._index.setdefault(gram, []).append(position)
+        self.match = lru_cache(maxsize=8192)(self._match)
+
+    # vocabulary is the model's term list, e.g. model.vocabulary
+    @classmethod
+    def from_csv(cls, training_path, vocabulary, **kwargs):
+        with open(training_path, newline='', encoding='utf-8') as f:
+            symptoms = [name for name in next(csv.reader(f)) if name.strip() and name != 'prognosis']
+        return cls(symptoms, vocabulary, **kwargs)
+
+    # Whether the model's vectorizer keeps any word of text
+    def in_model(self, text):
+        return any(token in self.vocabulary for token in self._token_re.findall(text or ''))
+
+    # Closest target and its confidence, or (None, 0.0) when nothing is close enough
+    def closest(self, text):
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            for position in self._index.get(gram, ()):
+                shared[position] += 1
+
+        best, best_confidence = None, 0.0
+        for position, _ in shared.most_common(self.candidates):
+            target = self.targets[position]
+            length = max(len(text), len(target))
+            limit = int(length * (1 - self.min_confidence))
+            distance = edit_distance(text, target, limit)
+            confidence = 1 - distance / length
+            if confidence > best_confidence:
+                best, best_confidence = target, confidence
+        if best_confidence < self.min_confidence:
+            return None, 0.0
+        return best, round(best_confidence, 3)
+
+    def _match(self, text):
+        report = self._read(normalize_symptom(text))
+        mapped = set(self._token_re.findall(report["symptom"] or ''))
+        kept = []
+        for token in self._token_re.findall(report["input"]):
+            if token in self.vocabulary and token not in mapped and token not in kept:
+                kept.append(token)
+        report["kept_words"] = kept
+        report["in_model"] = bool(kept) or self.in_model(report["symptom"])
+        return report
+
+    def _read(self, text):
+        if not text:
+            return {"input": text, "symptom": None, "confidence": 0.0, "method": "empty"}
+        if text in self.symptoms:
+            return {"input": text, "symptom": text, "confidence": 1.0, "method": "exact"}
+        # Before synonyms: rewriting words the model reads would change its prediction
+        words = text.split()
+        if all(word in self.vocabulary for word in words):
+            return {"input": text, "symptom": text, "confidence": 1.0, "method": "vocabulary"}
+        if text in self.synonyms:
+            return {"input": text, "symptom": self.synonyms[text], "confidence": 0.95, "method": "synonym"}
+        reordered = self._by_words.get(frozenset(words) - FILLER_WORDS)
+        if reordered is not None:
+            return {"input": text, "symptom": reordered, "confidence": 0.95, "method": "reordered"}
+
+        # The whole phrase first ("sweling of stomach"), then word by word ("severe headake")
+        target, confidence = self.closest(text)
+        if target is not None:
+            return {"input": text, "symptom": target, "confidence": confidence, "method": "fuzzy"}
+
+        corrected, confidences = [], []
+        for word in words:
+            if word in self.vocabulary:
+                corrected.append(word)
+                continue
+            target, confidence = self.closest(word) if len(word) > 3 else (None, 0.0)
+            if target is not None:
+                corrected.append(target)
+                confidences.append(confidence)
+        if confidences:
+            return {"input": text, "symptom": ' '.join(corrected), "confidence": min(confidences), "method": "fuzzy"}
+        if corrected:  # Only vocabulary words survived; confidence is the share of words kept
+            confidence = round(len(corrected) / len(words), 3)
+            return {"input": text, "symptom": ' '.join(corrected), "confidence": confidence, "method": "vocabulary"}
+        return {"input": text, "symptom": None, "confidence": 0.0, "method": "unmatched"}
+
+    # Symptom strings for the model plus one match report per input; kept words follow
+    # their symptom as separate entries, so the differential still sees the symptom name
+    def normalize(self, symptoms):
+        matches = [dict(self.match(s)) for s in symptoms if str(s).strip()]
+        normalized = []
+        for m in matches:
+            m["kept_words"] = list(m["kept_words"])  # Reports are cached; hand out copies
+            if m["symptom"]:
+                normalized.append(m["symptom"])
+            normalized.extend(m["kept_words"])
+        return normalized, matches
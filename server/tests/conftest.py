@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules under test live next to predict.py and import each other by bare name
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
@@ -0,0 +1,54 @@
+import os
+import re
+
+import pytest
+
+from conftest import SERVER_DIR
+from model_bundle import TOKEN_PATTERN, read_vocabulary
+from symptom_matcher import SYNONYMS, SymptomMatcher
+
+TRAINING = os.path.join(SERVER_DIR, 'Medical_dataset', 'Training.csv')
+VOCABULARY = os.path.join(SERVER_DIR, 'Medical_dataset', 'tfidfsymptoms.csv')
+KNN = os.path.join(SERVER_DIR, 'model', 'knn.pkl')
+
+# Everyday wording the model already reads, in whole or in part
+COLLOQUIAL = ['body ache', 'dizzy', 'anxious', 'stomach ache', 'tummy ache', 'severe body ache',
+              'short of breath', 'pain in chest', 'itchy', 'chest pain']
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return SymptomMatcher.from_csv(TRAINING, read_vocabulary(VOCABULARY))
+
+
+def model_words(matcher, texts):
+    return {t for text in texts for t in re.findall(TOKEN_PATTERN, text) if t in matcher.vocabulary}
+
+
+@pytest.mark.parametrize('text', ['body ache', 'dizzy', 'anxious'])
+def test_vocabulary_input_is_not_rewritten_by_synonyms(matcher, text):
+    report = matcher.match(text)
+    assert (report['symptom'], report['method'], report['in_model']) == (text, 'vocabulary', True)
+
+
+def test_mapping_keeps_vocabulary_words_it_would_drop(matcher):
+    symptoms, [report] = matcher.normalize(['stomach ache'])
+    assert report['symptom'] == 'stomach pain' and report['kept_words'] == ['ache']
+    assert symptoms == ['stomach pain', 'ache']
+
+
+@pytest.mark.parametrize('text', sorted(SYNONYMS) + COLLOQUIAL)
+def test_model_words_of_the_input_always_reach_the_model(matcher, text):
+    symptoms, _ = matcher.normalize([text])
+    assert model_words(matcher, [text]) <= model_words(matcher, symptoms)
+
+
+@pytest.mark.skipif(not os.path.exists(KNN), reason="needs the trained model/knn.pkl")
+@pytest.mark.parametrize('text', ['body ache', 'dizzy', 'anxious', 'stomach ache', 'severe body ache'])
+def test_prediction_matches_unmatched_input(matcher, text):
+    from model_bundle import SklearnModel
+
+    model = SklearnModel(KNN, VOCABULARY)
+    symptoms, _ = matcher.normalize([text])
+    expected = model.predict(model.vectorize([text]))[0]
+    assert model.predict(model.vectorize([' '.join(symptoms)]))[0] == expected
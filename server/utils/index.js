@@ -1,5 +1,14 @@
 const connectDB = require("./db/connectDB");
 const corsConfig = require("./cors/corsConfig");
 const { hashPassword, comparePassword } = require("./bcrypt/bcryptUtils");
+const { predictDisease, reloadModel, startWorker } = require("./python/predictWorker");
 
-module.exports = { connectDB, corsConfig, hashPassword, comparePassword };
+module.exports = {
+  connectDB,
+  corsConfig,
+  hashPassword,
+  comparePassword,
+  predictDisease,
+  reloadPredictModel: reloadModel,
+  startPredictWorker: startWorker,
+};
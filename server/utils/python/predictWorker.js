@@ -0,0 +1,91 @@
+const { PythonShell } = require("python-shell");
+
+// Long-running predict.py process (started with --serve) shared by all requests
+const REQUEST_TIMEOUT_MS = Number(process.env.PREDICT_TIMEOUT_MS) || 10000;
+
+let shell = null;
+let nextId = 1;
+const pending = new Map();
+
+// Reject the requests still waiting on one worker process
+function failPending(worker, error) {
+  for (const [id, entry] of pending) {
+    if (entry.worker !== worker) continue;
+    clearTimeout(entry.timer);
+    entry.reject(error);
+    pending.delete(id);
+  }
+}
+
+function startWorker() {
+  if (shell) return shell;
+
+  const worker = new PythonShell("predict.py", {
+    mode: "json",
+    pythonOptions: ["-u"],
+    args: ["--serve"],
+  });
+
+  worker.on("message", (message) => {
+    const entry = pending.get(message.id);
+    if (!entry) return;
+
+    pending.delete(message.id);
+    clearTimeout(entry.timer);
+    if (message.error) {
+      entry.reject(new Error(message.error));
+    } else {
+      entry.resolve(message);
+    }
+  });
+
+  worker.on("stderr", (line) => console.error("[predict.py]", line));
+
+  worker.on("error", (error) => {
+    console.error("Prediction worker error:", error);
+  });
+
+  worker.on("close", () => {
+    // Restart lazily on the next request; anything still waiting has failed
+    if (shell === worker) shell = null;
+    failPending(worker, new Error("Prediction worker exited"));
+  });
+
+  shell = worker;
+  return worker;
+}
+
+// A worker that misses a deadline is assumed hung: the requests queued behind it would
+// time out too, so fail them now and kill it; the next request starts a fresh worker
+function abandonWorker(worker) {
+  if (shell === worker) shell = null;
+  failPending(worker, new Error("Prediction worker restarted after a timeout"));
+  worker.kill("SIGKILL");
+}
+
+function send(request) {
+  return new Promise((resolve, reject) => {
+    const id = nextId++;
+    const worker = shell || startWorker();
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      reject(new Error("Prediction timed out"));
+      abandonWorker(worker);
+    }, REQUEST_TIMEOUT_MS);
+
+    pending.set(id, { resolve, reject, timer, worker });
+    worker.send({ ...request, id });
+  });
+}
+
+function predictDisease(symptoms) {
+  return send({ symptoms });
+}
+
+// Ask the worker to load the model files again; it keeps answering with the current
+// model until the new one is loaded and warmed, then swaps it in between requests
+function reloadModel() {
+  return send({ op: "reload" });
+}
+
+module.exports = { predictDisease, reloadModel, startWorker };
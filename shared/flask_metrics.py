@@ -0,0 +1,69 @@
+import os
+import time
+
+from flask import Response, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+                               multiprocess)
+
+
+class ServiceMetrics:
+    """Request, stage and model-version metrics of one Flask service, named <prefix>_*.
+
+    Each service's metrics.py creates one of these next to its own metrics and
+    exposes stage(), set_model_version(), count_reload() and instrument() as
+    module functions.
+    """
+
+    def __init__(self, prefix, stage_help, stage_buckets, request_buckets):
+        self.stage_seconds = Histogram(
+            f"{prefix}_stage_seconds", stage_help, ["stage"], buckets=stage_buckets)
+        self.request_seconds = Histogram(
+            f"{prefix}_request_seconds", "End-to-end request latency", ["endpoint"], buckets=request_buckets)
+        self.requests = Counter(
+            f"{prefix}_requests_total", "Requests by endpoint and HTTP status", ["endpoint", "status"])
+        self.model_info = Gauge(
+            f"{prefix}_model_info", "1 for the model version each worker is serving, 0 for versions it replaced",
+            ["version"], multiprocess_mode="liveall")
+        self.reloads = Counter(
+            f"{prefix}_model_reloads_total", "Model hot-reload attempts, by outcome", ["outcome"])
+        self._model_version = None
+
+    def stage(self, name):
+        return self.stage_seconds.labels(name).time()
+
+    # Replaced versions are set to 0 rather than removed: multiprocess files keep every sample
+    def set_model_version(self, version):
+        if self._model_version is not None and self._model_version != version:
+            self.model_info.labels(self._model_version).set(0)
+        self.model_info.labels(version).set(1)
+        self._model_version = version
+
+    # ModelWatcher on_outcome callback
+    def count_reload(self, outcome):
+        self.reloads.labels(outcome).inc()
+
+    # Time and count every request, and serve GET /metrics
+    def instrument(self, app):
+        @app.before_request
+        def start_timer():
+            request.metrics_start = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            if endpoint != "/metrics":
+                self.request_seconds.labels(endpoint).observe(time.perf_counter() - request.metrics_start)
+                self.requests.labels(endpoint, str(response.status_code)).inc()
+            return response
+
+        app.add_url_rule("/metrics", "metrics", metrics_response)
+
+
+def metrics_response():
+    # Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, every worker writes its own
+    # files and any one of them can report the sum
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
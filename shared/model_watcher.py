@@ -0,0 +1,91 @@
+import os
+import sys
+import signal
+import threading
+import traceback
+
+
+# Size and modification time of each file, None when it is missing
+def file_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class ModelWatcher:
+    """Runs reload() on a background thread when the model files change or on request.
+
+    The files are polled every `interval` seconds (0 polls never; only request()
+    and the signal reload). A change is acted on once two polls in a row agree,
+    so files still being copied into place are not loaded half-written.
+
+    reload() should load and warm the new model, then swap it in; the service
+    keeps answering with the current model until then. If it raises, the error
+    is logged, the current model stays, and the same files are not tried again
+    until they change.
+    """
+
+    def __init__(self, paths, reload, interval=5.0, name="model-watcher", on_outcome=None):
+        self.paths = list(paths)
+        self.reload = reload
+        self.interval = float(interval)
+        self.name = name
+        self.on_outcome = on_outcome  # Called with "success" or "failure" after each attempt
+        self.reloads = 0
+        self.failures = 0
+        self._loaded = self._seen = file_signature(self.paths)
+        self._wake = threading.Event()
+        self._pid = None
+
+    # Start the polling thread; again in a forked child, which does not inherit it
+    def start(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        return self
+
+    # Reload now, whether or not the files changed
+    def request(self):
+        self._wake.set()
+
+    # Reload on signum as well; handlers can only be installed from the main thread
+    def install_signal(self, signum=signal.SIGHUP):
+        if threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.request())
+        return True
+
+    def _run(self):
+        while True:
+            requested = self._wake.wait(self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            current = file_signature(self.paths)
+            settled = current == self._seen
+            self._seen = current
+            if requested or (settled and current != self._loaded):
+                self._reload(current)
+
+    def _reload(self, signature):
+        # Recorded before loading: files replaced again mid-load are picked up on the next poll
+        self._loaded = signature
+        try:
+            self.reload()
+        except Exception:
+            self.failures += 1
+            print(f"[{self.name}] Reload failed, keeping the current model", file=sys.stderr)
+            traceback.print_exc()
+            outcome = "failure"
+        else:
+            self.reloads += 1
+            outcome = "success"
+        if self.on_outcome is not None:
+            self.on_outcome(outcome)
+
+    def report(self):
+        return {"reloads": self.reloads, "failures": self.failures}
@@ -0,0 +1,61 @@
+import os
+import sys
+import argparse
+
+# Python modules used by more than one deploy unit. Each unit (the Node server's
+# predict worker, the skin predictor, the chatbot) is built and deployed from its own
+# directory, so it carries a copy; this directory holds the only copy to edit.
+#
+#   python shared/sync.py           # rewrite the copies after editing a module here
+#   python shared/sync.py --check   # exit 1 if any copy differs (pre-commit runs this)
+SHARED = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SHARED)
+CHATBOT = 'client/src/Medical-Chatbot/prediction'
+
+COPIES = {
+    'model_watcher.py': ['server', 'server/skin-predictor', CHATBOT],
+    'profiling.py': ['server/skin-predictor', CHATBOT],
+    'flask_metrics.py': ['server/skin-predictor', CHATBOT],
+    'benchmarking.py': ['server', 'server/skin-predictor', CHATBOT],
+}
+
+
+def header(name):
+    return f"# Generated from shared/{name} by shared/sync.py; edit that file and re-run the script.\n\n"
+
+
+def expected_copies():
+    for name, directories in COPIES.items():
+        with open(os.path.join(SHARED, name), encoding='utf-8') as f:
+            content = header(name) + f.read()
+        for directory in directories:
+            yield os.path.join(directory, name), content
+
+
+def stale_copies():
+    for path, content in expected_copies():
+        try:
+            with open(os.path.join(ROOT, path), encoding='utf-8') as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != content:
+            yield path, content
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Copy the shared Python modules into each service.")
+    parser.add_argument('--check', action='store_true', help="only report copies that are out of date")
+    args = parser.parse_args()
+
+    stale = list(stale_copies())
+    if args.check:
+        for path, _ in stale:
+            print(f"{path} is out of date; edit shared/{os.path.basename(path)} and run python shared/sync.py",
+                  file=sys.stderr)
+        sys.exit(1 if stale else 0)
+
+    for path, content in stale:
+        with open(os.path.join(ROOT, path), 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"Updated {path}")